@@ -0,0 +1,138 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from functools import lru_cache
+from camera_settings import RULE_DEFAULTS, camera_settings
+
+ENV_VAR = "FALL_DETECTION_CONFIG"
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+# settings ConfigService pushes into running cameras, everything else
+# (model, imgsz, buffers, ports, ...) is read once at startup
+HOT_KEYS = {
+    ("params", "person_conf_threshold"),
+    ("params", "keypoint_conf_threshold"),
+    ("params", "min_visible_keypoints"),
+    ("motion", "min_area_ratio"),
+    ("motion", "heartbeat_seconds"),
+    *RULE_DEFAULTS.values()
+}
+
+logger = logging.getLogger(__name__)
+
+
+def config_path():
+    """--config on the command line, else $FALL_DETECTION_CONFIG, else config.json next to this file"""
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument("--config")
+    args, _ = parser.parse_known_args(sys.argv[1:])
+
+    path = os.path.abspath(args.config or os.environ.get(ENV_VAR) or DEFAULT_CONFIG_PATH)
+    # spawned camera / inference processes read the same file
+    os.environ[ENV_VAR] = path
+    return path
+
+
+@lru_cache(maxsize=None)
+def load_config(path=None):
+    """Read and validate config.json once per process, every module shares the same dict"""
+    with open(path or config_path(), "r") as f:
+        config = json.load(f)
+    camera_settings(config, {})
+    return config
+
+
+def flatten(config, prefix=()):
+    """{("section", "key"): value} of all settings, the _desc strings left out"""
+    items = {}
+    for key, value in config.items():
+        if key.endswith("_desc"):
+            continue
+        if isinstance(value, dict):
+            items.update(flatten(value, prefix + (key,)))
+        else:
+            items[prefix + (key,)] = value
+    return items
+
+
+def check_structure(config, reference, prefix=()):
+    """Raise ValueError when a section that is an object in reference is something else in config"""
+    if not isinstance(config, dict):
+        name = ".".join(prefix) or "config"
+        raise ValueError(f"{name} must be an object, got {type(config).__name__}")
+    for key, value in reference.items():
+        if isinstance(value, dict) and key in config:
+            check_structure(config[key], value, prefix + (key,))
+
+
+class ConfigService:
+    """
+    Settings of one camera: config.json merged with its AnalyticsConfig
+
+    settings is camera_settings() of the file at startup. poll() looks at
+    the file's mtime every interval seconds; when it changed and the new
+    file is valid, settings is replaced and returned so the caller can push
+    the thresholds (HOT_KEYS) into the running PoseEstimator, FallMemory and
+    MotionGate. Changes to any other key are reported as needing a restart.
+    An invalid file (bad JSON, missing keys, a section that is no longer an
+    object, invalid values) is logged and the current settings are kept.
+    """
+
+    def __init__(self, analytics_config=None, path=None):
+        self.path = path or config_path()
+        self.analytics_config = analytics_config or {}
+
+        config = load_config(path)
+        # sections and their nesting as validated at startup
+        self.reference = config
+        self.enabled = config["hot_reload"]["enabled"]
+        self.interval = config["hot_reload"]["interval_seconds"]
+        self.settings = camera_settings(config, self.analytics_config)
+
+        self.raw = flatten(config)
+        self.mtime = self._mtime()
+        self.checked = time.time()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def poll(self, now=None):
+        """Reload the file if it changed, returns the new settings or None"""
+        now = time.time() if now is None else now
+        if not self.enabled or now - self.checked < self.interval:
+            return None
+        self.checked = now
+
+        mtime = self._mtime()
+        if mtime is None or mtime == self.mtime:
+            return None
+        self.mtime = mtime
+
+        try:
+            with open(self.path, "r") as f:
+                config = json.load(f)
+            check_structure(config, self.reference)
+            settings = camera_settings(config, self.analytics_config)
+        except (OSError, KeyError, ValueError, TypeError, AttributeError) as e:
+            logger.error("Config reload of %s failed, keeping the current settings: %s", self.path, e)
+            return None
+
+        raw = flatten(config)
+        changed = sorted(key for key in raw.keys() | self.raw.keys() if raw.get(key) != self.raw.get(key))
+        self.raw = raw
+
+        restart = [".".join(key) for key in changed if key not in HOT_KEYS]
+        if restart:
+            logger.warning("Changed settings only apply after a restart: %s", restart)
+
+        if settings == self.settings:
+            return None
+        self.settings = settings
+        logger.info("Config reloaded: %s", [".".join(key) for key in changed if key in HOT_KEYS])
+        return settings
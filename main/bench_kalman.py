@@ -0,0 +1,91 @@
+"""
+Parity and speed of KeypointSmoother vs the former 17 filterpy filters per person
+
+Random walks with random visibility (and predicted-only frames) go through
+both implementations; prints the largest position difference and the time
+per frame.
+
+    python bench_kalman.py [--people 10] [--frames 300]
+"""
+import argparse
+import time
+
+import numpy as np
+from filterpy.kalman import KalmanFilter
+
+from kalman import KeypointSmoother
+
+
+def create_kf(x, y):
+    """Previous PoseEstimator.create_kf"""
+    kf = KalmanFilter(dim_x=4, dim_z=2)
+    kf.x = np.array([x, y, 0, 0], dtype=float)
+    kf.F = np.array([[1, 0, 1, 0],
+                     [0, 1, 0, 1],
+                     [0, 0, 1, 0],
+                     [0, 0, 0, 1]], dtype=float)
+    kf.H = np.array([[1, 0, 0, 0],
+                     [0, 1, 0, 0]], dtype=float)
+    kf.P *= 10
+    kf.R *= 0.1
+    kf.Q *= 0.01
+    return kf
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--people", type=int, default=10)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    ids = list(range(args.people))
+    kpts = rng.uniform(0, 1000, (args.frames, args.people, 17, 2))
+    kpts = kpts[0] + np.cumsum(rng.normal(0, 3, kpts.shape), axis=0)
+    visible = rng.random((args.frames, args.people, 17)) > 0.2
+    inferred = rng.random(args.frames) > 0.3
+    inferred[0] = True
+
+    # filterpy reference
+    filters = {}
+    reference = []
+    start = time.perf_counter()
+    for t in range(args.frames):
+        frame = []
+        for p in ids:
+            if p not in filters:
+                filters[p] = [create_kf(x, y) for x, y in kpts[t, p]]
+            out = []
+            for i, kf in enumerate(filters[p]):
+                kf.predict()
+                if inferred[t] and visible[t, p, i]:
+                    kf.update(kpts[t, p, i])
+                out.append((kf.x[0], kf.x[1]))
+            frame.append(out)
+        reference.append(frame)
+    filterpy_time = time.perf_counter() - start
+
+    # batched
+    smoother = KeypointSmoother()
+    batched = []
+    start = time.perf_counter()
+    for t in range(args.frames):
+        if inferred[t]:
+            for p in ids:
+                if p not in smoother:
+                    smoother.add(p, kpts[t, p])
+            batched.append(smoother.step(ids, kpts[t], visible[t]))
+        else:
+            batched.append(smoother.predict(ids))
+    batched_time = time.perf_counter() - start
+
+    max_diff = float(np.abs(np.array(reference) - np.array(batched)).max())
+    print(f"max position difference: {max_diff:.3e} px")
+    print(f"filterpy: {1000 * filterpy_time / args.frames:.3f} ms/frame")
+    print(f"batched:  {1000 * batched_time / args.frames:.3f} ms/frame "
+          f"({filterpy_time / max(batched_time, 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
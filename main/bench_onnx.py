@@ -0,0 +1,134 @@
+"""
+Parity and throughput report: ultralytics (.pt) vs onnxruntime (fp32 / int8)
+
+For every clip in video/ the same frames go through each backend. Parity is
+measured against the ultralytics detections (boxes matched by IoU):
+detection count difference, mean box IoU and mean keypoint error in pixels.
+
+    python bench_onnx.py --videos ../video --frames 100 --out onnx_report.json
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from pose_module import detect_batch, default_imgsz, conf, onnx_cache_dir
+from onnx_backend import OnnxPoseModel
+
+
+def read_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def box_iou(a, b):
+    """IoU matrix between (N,4) and (M,4) xyxy boxes"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def compare(reference, candidate):
+    """Greedy IoU matching of one frame, returns (count diff, matched IoUs, keypoint errors)"""
+    ref_boxes, _, ref_kpts, ref_conf = reference
+    cand_boxes, _, cand_kpts, _ = candidate
+
+    ious, kpt_errors = [], []
+    if len(ref_boxes) and len(cand_boxes):
+        iou = box_iou(ref_boxes, cand_boxes)
+        while iou.size and iou.max() > 0.5:
+            i, j = np.unravel_index(iou.argmax(), iou.shape)
+            ious.append(float(iou[i, j]))
+            visible = ref_conf[i] > 0.5
+            if visible.any():
+                kpt_errors.append(float(np.linalg.norm(ref_kpts[i][visible] - cand_kpts[j][visible], axis=1).mean()))
+            iou[i, :] = 0
+            iou[:, j] = 0
+
+    return abs(len(ref_boxes) - len(cand_boxes)), ious, kpt_errors
+
+
+def run_backend(name, model, frames, batch, imgsz):
+    outputs = []
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch):
+        outputs.extend(detect_batch(model, frames[i:i + batch], imgsz, conf))
+    elapsed = time.perf_counter() - start
+    return outputs, len(frames) / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True, help="yolo pose .pt weights")
+    parser.add_argument("--videos", default=os.path.join(os.path.dirname(__file__), "..", "video"))
+    parser.add_argument("--frames", type=int, default=100, help="frames per clip")
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--imgsz", type=int, default=default_imgsz)
+    parser.add_argument("--threads", type=int, default=0, help="onnxruntime intra-op threads")
+    parser.add_argument("--out", default="onnx_report.json")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    backends = {
+        "ultralytics": YOLO(args.model),
+        "onnx_fp32": OnnxPoseModel(args.model, onnx_cache_dir, int8=False, intra_threads=args.threads),
+        "onnx_int8": OnnxPoseModel(args.model, onnx_cache_dir, int8=True, intra_threads=args.threads)
+    }
+
+    report = {"imgsz": args.imgsz, "batch": args.batch, "clips": {}}
+
+    for path in sorted(glob.glob(os.path.join(args.videos, "*.mp4"))):
+        frames = read_frames(path, args.frames)
+        if not frames:
+            continue
+
+        clip = {}
+        outputs = {}
+        for name, model in backends.items():
+            run_backend(name, model, frames[:1], 1, args.imgsz)  # warm up / export
+            outputs[name], fps = run_backend(name, model, frames, args.batch, args.imgsz)
+            clip[name] = {"fps": round(fps, 2)}
+
+        for name in ("onnx_fp32", "onnx_int8"):
+            count_diff, ious, kpt_errors = 0, [], []
+            for ref, cand in zip(outputs["ultralytics"], outputs[name]):
+                d, i, k = compare(ref, cand)
+                count_diff += d
+                ious.extend(i)
+                kpt_errors.extend(k)
+
+            clip[name].update({
+                "count_mismatch": count_diff,
+                "mean_box_iou": round(float(np.mean(ious)), 4) if ious else None,
+                "mean_kpt_error_px": round(float(np.mean(kpt_errors)), 2) if kpt_errors else None
+            })
+
+        report["clips"][os.path.basename(path)] = clip
+        print(f"{os.path.basename(path):<10} " + "  ".join(
+            f"{name}: {r['fps']:6.1f} fps" for name, r in clip.items()
+        ))
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
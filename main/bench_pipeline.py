@@ -0,0 +1,234 @@
+"""
+Offline replay of the video/ clips through PoseEstimator and fall_rule_batch
+
+Every file is fed through the same per-frame path as run_camera (stride,
+pose + tracking, Kalman, rules) without MySQL or RTSP. Two modes:
+
+    realtime  frames arrive at the clip fps, frames the pipeline is too slow
+              for are dropped like a live camera with drop_stale_frames
+    max       every frame, as fast as possible
+
+Reports frames/s, p50/p95/p99 per-frame latency, memory and the detected
+falls per file as JSON, so runs can be compared across commits and configs.
+All files run in one process: per file the report has the resident memory
+and how far it grew above its level at the start of the file, the
+process-wide peak RSS is only in the total.
+
+    python bench_pipeline.py --mode max --out pipeline_report.json
+    python bench_pipeline.py --mode realtime --videos ../video --limit 300
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import resource
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+from pose_module import PoseEstimator, backend, default_imgsz
+from fall_rules import FallMemory, fall_rule_batch
+from stride import InferenceStride
+from logs import setup_logging
+from app_config import ENV_VAR, load_config
+
+config = load_config()
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def rss_mb():
+    """Current resident memory of this process, None where /proc is not available"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2)}
+
+
+def replay(path, model_path, mode, limit, frame_skip, max_frame_skip):
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or config["params"]["default_fps"]
+
+    # fresh tracker, Kalman and rule state per file, the model itself is cached
+    pose_estimator = PoseEstimator(model_path)
+    stride = InferenceStride(frame_skip, max_frame_skip, fps)
+    fall_memory = FallMemory()
+    pose_estimator.tracks.on_evict(lambda track_id: fall_memory.pop(track_id, None))
+
+    latencies = []
+    falls = []
+    frames = 0
+    dropped = 0
+    inferred = 0
+    index = -1
+
+    rss_start = rss_mb()
+    rss_max = rss_start
+
+    start = time.perf_counter()
+    while limit <= 0 or index + 1 < limit:
+        if mode == "realtime":
+            # skip the frames that "arrived" while the last one was processed
+            due = int((time.perf_counter() - start) * fps)
+            while index + 1 < due and (limit <= 0 or index + 1 < limit):
+                if not cap.grab():
+                    break
+                index += 1
+                dropped += 1
+
+            # wait for the next frame to arrive
+            arrival = start + (index + 1) / fps
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        ret, frame = cap.read()
+        if not ret:
+            break
+        index += 1
+        video_time = index / fps
+
+        frame_start = time.perf_counter()
+        if mode == "realtime":
+            # latency of a live frame counts from its arrival
+            frame_start = min(frame_start, start + index / fps)
+
+        infer = stride.should_infer()
+        infer_start = time.perf_counter()
+        detections = pose_estimator.process_frame(frame, infer=infer)
+        infer = pose_estimator.keyframe
+        infer_time = time.perf_counter() - infer_start if infer else None
+
+        results = fall_rule_batch(
+            detections.ids, detections.kpts, detections.boxes,
+            fps=fps,
+            fall_memory=fall_memory,
+            camera_id=os.path.basename(path),
+            camera_name="replay",
+            now=video_time
+        )
+        statuses = [status for status, _ in results]
+        for person_id, (status, alert_triggered) in zip(detections.ids.tolist(), results):
+            if alert_triggered:
+                falls.append({"frame": index, "time": round(video_time, 3), "person_id": person_id})
+
+        stride.update(statuses, infer_time)
+
+        latencies.append(time.perf_counter() - frame_start)
+        frames += 1
+        inferred += int(infer)
+
+        if rss_start is not None:
+            rss_max = max(rss_max, rss_mb())
+
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    return {
+        "video_fps": round(fps, 2),
+        "frames": frames,
+        "dropped": dropped,
+        "inferred": inferred,
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+        "seconds": round(elapsed, 3),
+        "latency_ms": percentiles(latencies),
+        "rss_mb": round(rss_mb(), 1) if rss_start is not None else None,
+        "rss_growth_mb": round(rss_max - rss_start, 1) if rss_start is not None else None,
+        "tracks": pose_estimator.tracks.stats(),
+        "falls": falls
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=config["params"]["model_path"])
+    parser.add_argument("--videos", default=os.path.join(os.path.dirname(__file__), "..", "video"))
+    parser.add_argument("--mode", choices=("realtime", "max"), default="max")
+    parser.add_argument("--limit", type=int, default=0, help="frames per file, 0 = whole file")
+    parser.add_argument("--frame-skip", type=int, default=config["params"]["frame_skip"])
+    parser.add_argument("--max-frame-skip", type=int, default=config["params"]["max_frame_skip"])
+    parser.add_argument("--verbose", action="store_true", help="log every fall with its rule trace")
+    # read by app_config.config_path() before anything else is imported
+    parser.add_argument("--config", help=f"config.json to use, default ${ENV_VAR} or main/config.json")
+    parser.add_argument("--out", default="pipeline_report.json")
+    args = parser.parse_args()
+
+    setup_logging()
+    # keep the fall logs out of the timings unless asked for
+    logging.getLogger("fall_rules").setLevel(logging.INFO if args.verbose else logging.ERROR)
+
+    paths = sorted(glob.glob(os.path.join(args.videos, "*.mp4")))
+    if not paths:
+        print(f"[ERROR] No .mp4 files in {args.videos}")
+        return
+
+    report = {
+        "commit": git_commit(),
+        "mode": args.mode,
+        "backend": backend,
+        "model": os.path.basename(args.model),
+        "imgsz": default_imgsz,
+        "frame_skip": args.frame_skip,
+        "max_frame_skip": args.max_frame_skip,
+        "files": {}
+    }
+
+    # warm up (model load / ONNX export) outside the measurements
+    warmup = cv2.VideoCapture(paths[0])
+    ret, frame = warmup.read()
+    warmup.release()
+    if ret:
+        PoseEstimator(args.model).process_frame(frame)
+
+    for path in paths:
+        name = os.path.basename(path)
+        result = replay(path, args.model, args.mode, args.limit,
+                        args.frame_skip, args.max_frame_skip)
+
+        report["files"][name] = result
+        lat = result["latency_ms"]
+        print(f"{name:<10} {result['fps']:7.1f} fps  p50 {lat['p50']} ms  p95 {lat['p95']} ms  "
+              f"p99 {lat['p99']} ms  dropped {result['dropped']}  falls {len(result['falls'])}")
+
+    files = report["files"].values()
+    total_frames = sum(r["frames"] for r in files)
+    total_seconds = sum(r["seconds"] for r in files)
+    report["total"] = {
+        "frames": total_frames,
+        "fps": round(total_frames / total_seconds, 2) if total_seconds else 0.0,
+        "falls": sum(len(r["falls"]) for r in files),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Parity and speed of fall_rule_batch vs the former per-person fall_rule_based
+
+Keypoint streams go through both implementations frame by frame; every
+status, alert and indicator list has to be identical, the script exits
+with status 1 on the first clip that differs. Streams come from:
+
+    --videos   the clips through PoseEstimator (--model, default the one of config.json)
+    --streams  a JSONL file written earlier with --record
+    neither    synthetic people that stand, fall and leave the scene
+
+    python bench_rules.py --videos ../video --record rule_streams.jsonl
+    python bench_rules.py --streams rule_streams.jsonl
+    python bench_rules.py [--frames 3000] [--people 10]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from fall_rules import FallMemory, fall_rule_batch, N, M, memory_frames
+from logs import setup_logging
+from app_config import ENV_VAR, load_config
+
+
+def get_angle(p1, p2):
+    dx, dy = p2[0] - p1[0], p2[1] - p1[1]
+    return np.degrees(np.arctan2(abs(dx), abs(dy)))
+
+
+def compute_features(kpts, box):
+    """Previous fall_rules.compute_features"""
+    nose = kpts[0]
+    left_shoulder, right_shoulder = kpts[5], kpts[6]
+    left_hip, right_hip = kpts[11], kpts[12]
+    left_ankle, right_ankle = kpts[15], kpts[16]
+
+    shoulder_mid = np.mean([left_shoulder, right_shoulder], axis=0)
+    hip_mid = np.mean([left_hip, right_hip], axis=0)
+    ankle_mid = np.mean([left_ankle, right_ankle], axis=0)
+
+    torso_angle = get_angle(shoulder_mid, hip_mid)
+    body_height = np.linalg.norm(nose - ankle_mid)
+    head_vs_ankle = nose[1] - ankle_mid[1]
+
+    x1, y1, x2, y2 = box
+    return {
+        "torso_angle": torso_angle,
+        "body_height": body_height,
+        "head_vs_ankle": head_vs_ankle,
+        "nose_y": nose[1],
+        "ankle_y": ankle_mid[1],
+        "bbox_h": y2 - y1,
+        "bbox_w": x2 - x1,
+        "bbox_cy": (y1 + y2) / 2
+    }
+
+
+def check_rapid_downward_movement(velocities, min_speed):
+    """Previous fall_rules.check_rapid_downward_movement"""
+    if len(velocities) < 2:
+        return False
+
+    recent_vels = velocities[-M:] if len(velocities) >= M else velocities
+    if not all(v > 0 for v in recent_vels):
+        return False
+
+    avg_velocity = np.mean(recent_vels)
+    max_velocity = max(recent_vels)
+    return avg_velocity > min_speed and max_velocity > min_speed
+
+
+def fall_rule_based(person_id, kpts, box, fps, fall_memory, rules, now):
+    """
+    Previous fall_rules.fall_rule_based, per person with dict state
+
+    The debug prints are left out, the thresholds come from rules
+    (camera_settings.rule_settings) instead of module globals.
+    """
+    feat = compute_features(kpts, box)
+
+    if person_id not in fall_memory:
+        fall_memory[person_id] = {
+            "frames": deque(maxlen=memory_frames),
+            "vel": deque(maxlen=M),
+            "frame_count": 0,
+            "fall_frames": 0,
+            "alert_sent": False,
+            "alert_time": 0,
+            "indicators": []
+        }
+    memory = fall_memory[person_id]
+
+    memory["frame_count"] += 1
+    frame_count = memory["frame_count"]
+
+    memory["frames"].append(feat)
+    feats = list(memory["frames"])
+
+    if len(feats) < N + 1:
+        return "NORMAL", False
+
+    if frame_count % N == 0 and len(feats) >= N + 1:
+        old_y = feats[-N - 1]["bbox_cy"]
+        new_y = feats[-1]["bbox_cy"]
+        memory["vel"].append((new_y - old_y) / (N / fps))
+
+    vel_list = list(memory["vel"])
+    rapid_downward = False
+    if len(vel_list) >= M:
+        rapid_downward = check_rapid_downward_movement(vel_list, rules["min_fall_speed"])
+
+    curr_feat = feats[-1]
+    prev_feat = feats[-N - 1]
+    height_halved = curr_feat["bbox_h"] < rules["height_drop_ratio"] * prev_feat["bbox_h"]
+    width_increased = curr_feat["bbox_w"] > rules["width_increase_ratio"] * prev_feat["bbox_w"]
+    height_dropping = height_halved or width_increased
+
+    heights = [f["body_height"] for f in feats]
+    rapid_height_loss = False
+    if len(heights) >= 5:
+        height_drop = (heights[-5] - heights[-1]) / max(1, heights[-5])
+        rapid_height_loss = height_drop > rules["height_drop"]
+
+    head_inversion = curr_feat["head_vs_ankle"] > 0
+
+    other_indicators = []
+    if height_dropping:
+        other_indicators.append("height_dropping")
+    if rapid_height_loss:
+        other_indicators.append("rapid_height_loss")
+    if head_inversion:
+        other_indicators.append("head_inversion")
+
+    fall_indicators = 0
+    indicators_detail = []
+    if rapid_downward:
+        fall_indicators += 1
+        indicators_detail.append("rapid_downward")
+    if len(other_indicators) >= 1:
+        fall_indicators += 1
+        indicators_detail.extend(other_indicators)
+
+    alert_triggered = False
+    if fall_indicators >= 2:
+        memory["fall_frames"] += 1
+        memory["indicators"] = indicators_detail
+
+        if memory["fall_frames"] >= rules["confirmation_frames"]:
+            if not memory["alert_sent"] or now - memory["alert_time"] > rules["alert_reset_second"]:
+                memory["alert_sent"] = True
+                memory["alert_time"] = now
+                alert_triggered = True
+            return "FALLING", alert_triggered
+        return "POTENTIAL_FALL", False
+
+    if memory["alert_sent"] and now - memory["alert_time"] > rules["alert_reset_second"]:
+        memory["alert_sent"] = False
+    memory["fall_frames"] = 0
+    return "NORMAL", False
+
+
+def video_streams(paths, model_path, limit):
+    """Keypoint stream of every clip as PoseEstimator sees it, tracks evicted by ByteTrack included"""
+    from pose_module import PoseEstimator
+
+    for path in paths:
+        pose_estimator = PoseEstimator(model_path)
+        evicted = []
+        pose_estimator.tracks.on_evict(evicted.append)
+
+        cap = cv2.VideoCapture(path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        frames = []
+        while limit is None or len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            people = pose_estimator.process_frame(frame)
+            frames.append({
+                "time": len(frames) / fps,
+                "ids": people.ids.tolist(),
+                "kpts": people.kpts.tolist(),
+                "boxes": people.boxes.tolist(),
+                "evicted": evicted[:]
+            })
+            evicted.clear()
+        cap.release()
+
+        yield os.path.basename(path), fps, frames
+
+
+def recorded_streams(path):
+    with open(path, "r") as f:
+        for line in f:
+            stream = json.loads(line)
+            yield stream["clip"], stream["fps"], stream["frames"]
+
+
+def synthetic_stream(frames, people, fps, seed):
+    """People walking around, some of them falling, with tracks appearing and being evicted"""
+    rng = np.random.default_rng(seed)
+    active = {}
+    next_id = 1
+    stream = []
+
+    for t in range(frames):
+        evicted = [pid for pid in active if rng.random() < 0.01]
+        for pid in evicted:
+            del active[pid]
+        if len(active) < people and (rng.random() < 0.05 or not active):
+            active[next_id] = dict(cy=rng.uniform(100, 300), h=rng.uniform(150, 300),
+                                   w=rng.uniform(50, 100), x=rng.uniform(0, 500), fall=0)
+            next_id += 1
+
+        ids, kpts, boxes = [], [], []
+        for pid, p in active.items():
+            if p["fall"] == 0 and rng.random() < 0.02:
+                p["fall"] = 40
+            if p["fall"] > 0:
+                p["fall"] -= 1
+                p["cy"] += rng.uniform(3, 15)
+                p["h"] *= rng.uniform(0.85, 1.0)
+                p["w"] *= rng.uniform(1.0, 1.1)
+            else:
+                p["cy"] += rng.normal(0, 2)
+                p["h"] = max(50, p["h"] + rng.normal(0, 3))
+                p["w"] = max(20, p["w"] + rng.normal(0, 2))
+
+            x1, y1 = p["x"], p["cy"] - p["h"] / 2
+            k = rng.uniform(0, 1, (17, 2)) * [p["w"], p["h"]] + [x1, y1]
+            if rng.random() < 0.5:
+                # upright: nose at the top, ankles at the bottom of the box
+                k[0, 1] = y1 + 5
+                k[15, 1] = k[16, 1] = y1 + p["h"] - 5
+            if p["fall"] > 0 and rng.random() < 0.5:
+                k[0, 1] = y1 + p["h"] - 2
+
+            ids.append(pid)
+            kpts.append(k.tolist())
+            boxes.append([x1, y1, x1 + p["w"], y1 + p["h"]])
+
+        stream.append({"time": t / fps, "ids": ids, "kpts": kpts, "boxes": boxes, "evicted": evicted})
+
+    return stream
+
+
+def replay(frames, fps):
+    """Run one stream through both implementations, returns (mismatches, decisions, timings)"""
+    baseline_memory = {}
+    fall_memory = FallMemory()
+    rules = fall_memory.settings
+
+    mismatches = []
+    decisions = {}
+    baseline_time = batch_time = 0.0
+
+    for index, frame in enumerate(frames):
+        for track_id in frame["evicted"]:
+            baseline_memory.pop(track_id, None)
+            fall_memory.pop(track_id, None)
+
+        ids = frame["ids"]
+        kpts = np.asarray(frame["kpts"], dtype=float).reshape(-1, 17, 2)
+        boxes = np.asarray(frame["boxes"], dtype=float).reshape(-1, 4)
+
+        start = time.perf_counter()
+        expected = [
+            fall_rule_based(person_id, kpts[i], boxes[i], fps, baseline_memory, rules, frame["time"])
+            for i, person_id in enumerate(ids)
+        ]
+        baseline_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = fall_rule_batch(ids, kpts, boxes, fps, fall_memory, now=frame["time"])
+        batch_time += time.perf_counter() - start
+
+        for i, person_id in enumerate(ids):
+            status, alert = expected[i]
+            decisions[status] = decisions.get(status, 0) + 1
+            decisions["alerts"] = decisions.get("alerts", 0) + alert
+
+            indicators = baseline_memory[person_id]["indicators"]
+            if results[i] != expected[i] or fall_memory.indicators_of(person_id) != indicators:
+                mismatches.append((index, person_id, expected[i], indicators,
+                                   results[i], fall_memory.indicators_of(person_id)))
+
+    return mismatches, decisions, (baseline_time, batch_time)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", help="folder of .mp4 clips, run through the pose model")
+    parser.add_argument("--model", default=load_config()["params"]["model_path"])
+    parser.add_argument("--streams", help="JSONL keypoint streams from --record")
+    parser.add_argument("--record", help="write the replayed streams to this JSONL file")
+    parser.add_argument("--limit", type=int, default=None, help="frames per clip")
+    parser.add_argument("--frames", type=int, default=3000, help="synthetic frames")
+    parser.add_argument("--people", type=int, default=10, help="synthetic people at most")
+    parser.add_argument("--fps", type=float, default=20.0, help="synthetic fps")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--config", help=f"config.json to use, default ${ENV_VAR} or main/config.json")
+    args = parser.parse_args()
+
+    setup_logging()
+    # fall confirmations and their traces of both runs, only the comparison matters here
+    logging.getLogger("fall_rules").setLevel(logging.ERROR)
+
+    if args.videos:
+        streams = video_streams(sorted(glob.glob(os.path.join(args.videos, "*.mp4"))), args.model, args.limit)
+    elif args.streams:
+        streams = recorded_streams(args.streams)
+    else:
+        streams = [("synthetic", args.fps, synthetic_stream(args.frames, args.people, args.fps, args.seed))]
+
+    record = open(args.record, "w") if args.record else None
+    failed = False
+    total_frames = 0
+    total_time = [0.0, 0.0]
+
+    for clip, fps, frames in streams:
+        if record is not None:
+            record.write(json.dumps({"clip": clip, "fps": fps, "frames": frames}) + "\n")
+
+        mismatches, decisions, timings = replay(frames, fps)
+        total_frames += len(frames)
+        total_time[0] += timings[0]
+        total_time[1] += timings[1]
+
+        people = sum(n for status, n in decisions.items() if status != "alerts")
+        print(f"{clip:<12} frames: {len(frames):5d} decisions: {people:6d} "
+              f"potential: {decisions.get('POTENTIAL_FALL', 0):4d} falling: {decisions.get('FALLING', 0):4d} "
+              f"alerts: {decisions.get('alerts', 0):3d} mismatches: {len(mismatches)}")
+
+        for index, person_id, expected, indicators, got, got_indicators in mismatches[:5]:
+            print(f"  frame {index} track {person_id}: baseline {expected} {indicators}, "
+                  f"batch {got} {got_indicators}")
+        failed = failed or bool(mismatches)
+
+    if record is not None:
+        record.close()
+
+    if total_frames:
+        baseline_time, batch_time = total_time
+        print(f"\nper-person rules: {1000 * baseline_time / total_frames:.3f} ms/frame")
+        print(f"batched rules:    {1000 * batch_time / total_frames:.3f} ms/frame "
+              f"({baseline_time / max(batch_time, 1e-9):.1f}x)")
+
+    if failed:
+        raise SystemExit("fall_rule_batch differs from the baseline")
+    print("statuses, alerts and indicators identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of the alert snapshot encoding
+
+Compares the old PIL round-trip (BGR->RGB, PIL JPEG into BytesIO, base64)
+with the cv2.imencode path of snapshot.py.
+
+    python bench_snapshot.py [video_or_image] [--runs 50]
+"""
+import argparse
+import base64
+import time
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from snapshot import make_snapshot, encode_jpeg, to_data_url
+
+
+def img_to_data_url_pil(img):
+    """Previous implementation from main.py"""
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    pil_img = Image.fromarray(img_rgb)
+    buffered = BytesIO()
+    pil_img.save(buffered, format="JPEG")
+    img_encoded = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    return f"data:image/jpeg;base64,{img_encoded}"
+
+
+def load_frame(source):
+    if source is None:
+        # 1080p noise + gradient, roughly as hard to compress as a camera frame
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 40, (1080, 1920, 3), dtype=np.uint8)
+        frame += np.linspace(0, 200, 1920, dtype=np.uint8)[None, :, None]
+        return frame
+
+    img = cv2.imread(source)
+    if img is not None:
+        return img
+
+    cap = cv2.VideoCapture(source)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        raise SystemExit(f"Could not read a frame from {source}")
+    return frame
+
+
+def bench(name, fn, frame, runs):
+    fn(frame)  # warm up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = fn(frame)
+        times.append((time.perf_counter() - start) * 1000)
+
+    size = len(out[0]) if isinstance(out, tuple) else len(out)
+    times = np.array(times)
+    print(f"{name:<34} mean {times.mean():7.2f} ms   p95 {np.percentile(times, 95):7.2f} ms   "
+          f"{size / 1024:8.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default=None)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    frame = load_frame(args.source)
+    print(f"Frame {frame.shape[1]}x{frame.shape[0]}, {args.runs} runs\n")
+
+    bench("PIL round-trip (old)", img_to_data_url_pil, frame, args.runs)
+    # PIL saves at quality 75 by default
+    bench("cv2.imencode q75 full size", lambda f: to_data_url(encode_jpeg(f, 75)), frame, args.runs)
+    bench("cv2.imencode q85 max 1280", lambda f: to_data_url(encode_jpeg(f, 85, 1280)), frame, args.runs)
+    bench("make_snapshot (+ thumbnail)", make_snapshot, frame, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+ByteTrack on NumPy detection arrays, one instance per camera
+
+Same association as ultralytics' BYTETracker (high score match, low score
+second match, unconfirmed tracks, track_buffer for lost tracks) driven by
+the bytetrack.yaml parameters, but independent of the model object, so
+detection stays a stateless batched call. Association uses lap
+(Jonker-Volgenant) and cython_bbox IoU.
+"""
+import lap
+import numpy as np
+
+try:
+    from cython_bbox import bbox_overlaps
+except ImportError:  # pragma: no cover - cython_bbox is in requirements.txt
+    bbox_overlaps = None
+
+
+# ---------------------------------
+# Kalman filter on [cx, cy, aspect, h] + velocities, batched over tracks
+# ---------------------------------
+STD_POSITION = 1.0 / 20
+STD_VELOCITY = 1.0 / 160
+
+MOTION = np.eye(8)
+MOTION[:4, 4:] = np.eye(4)
+
+
+def xyxy_to_xyah(xyxy):
+    xyxy = np.asarray(xyxy, dtype=float).reshape(-1, 4)
+    w = xyxy[:, 2] - xyxy[:, 0]
+    h = xyxy[:, 3] - xyxy[:, 1]
+    return np.stack([xyxy[:, 0] + w / 2, xyxy[:, 1] + h / 2, w / h, h], axis=1)
+
+
+def xyah_to_xyxy(xyah):
+    w = xyah[:, 2] * xyah[:, 3]
+    h = xyah[:, 3]
+    x1 = xyah[:, 0] - w / 2
+    y1 = xyah[:, 1] - h / 2
+    return np.stack([x1, y1, x1 + w, y1 + h], axis=1)
+
+
+def kf_initiate(xyah):
+    n = len(xyah)
+    mean = np.concatenate([xyah, np.zeros((n, 4))], axis=1)
+    h = xyah[:, 3]
+    std = np.stack([
+        2 * STD_POSITION * h, 2 * STD_POSITION * h, np.full(n, 1e-2), 2 * STD_POSITION * h,
+        10 * STD_VELOCITY * h, 10 * STD_VELOCITY * h, np.full(n, 1e-5), 10 * STD_VELOCITY * h
+    ], axis=1)
+    cov = np.zeros((n, 8, 8))
+    cov[:, np.arange(8), np.arange(8)] = std ** 2
+    return mean, cov
+
+
+def kf_predict(mean, cov):
+    n = len(mean)
+    h = mean[:, 3]
+    std = np.stack([
+        STD_POSITION * h, STD_POSITION * h, np.full(n, 1e-2), STD_POSITION * h,
+        STD_VELOCITY * h, STD_VELOCITY * h, np.full(n, 1e-5), STD_VELOCITY * h
+    ], axis=1)
+    motion_cov = np.zeros((n, 8, 8))
+    motion_cov[:, np.arange(8), np.arange(8)] = std ** 2
+
+    mean = mean @ MOTION.T
+    cov = MOTION @ cov @ MOTION.T + motion_cov
+    return mean, cov
+
+
+def kf_update(mean, cov, xyah):
+    n = len(mean)
+    h = mean[:, 3]
+    std = np.stack([STD_POSITION * h, STD_POSITION * h, np.full(n, 1e-1), STD_POSITION * h], axis=1)
+
+    projected_mean = mean[:, :4]
+    projected_cov = cov[:, :4, :4].copy()
+    projected_cov[:, np.arange(4), np.arange(4)] += std ** 2
+
+    # K = P H^T S^-1, S symmetric
+    PHT = cov[:, :, :4]                                                   # (n, 8, 4)
+    gain = np.linalg.solve(projected_cov, PHT.transpose(0, 2, 1)).transpose(0, 2, 1)
+
+    innovation = xyah - projected_mean
+    mean = mean + (gain @ innovation[..., None])[..., 0]
+    cov = cov - gain @ projected_cov @ gain.transpose(0, 2, 1)
+    return mean, cov
+
+
+# ---------------------------------
+# Association
+# ---------------------------------
+def iou_matrix(a, b):
+    a = np.ascontiguousarray(a, dtype=np.float64)
+    b = np.ascontiguousarray(b, dtype=np.float64)
+    if bbox_overlaps is not None:
+        return bbox_overlaps(a, b)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1 + 1, 0, None) * np.clip(y2 - y1 + 1, 0, None)
+    area_a = (a[:, 2] - a[:, 0] + 1) * (a[:, 3] - a[:, 1] + 1)
+    area_b = (b[:, 2] - b[:, 0] + 1) * (b[:, 3] - b[:, 1] + 1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter)
+
+
+def iou_distance(tracks, detections):
+    if not tracks or not detections:
+        return np.zeros((len(tracks), len(detections)))
+    return 1 - iou_matrix(
+        np.array([t.xyxy for t in tracks]),
+        np.array([d.xyxy for d in detections])
+    )
+
+
+def fuse_score(cost, detections):
+    if cost.size == 0:
+        return cost
+    scores = np.array([d.score for d in detections])
+    return 1 - (1 - cost) * scores[None, :]
+
+
+def linear_assignment(cost, thresh):
+    """Returns (matches [(track, det)], unmatched tracks, unmatched detections)"""
+    if cost.size == 0:
+        return [], list(range(cost.shape[0])), list(range(cost.shape[1]))
+
+    _, x, y = lap.lapjv(cost, extend_cost=True, cost_limit=thresh)
+    matches = [(i, j) for i, j in enumerate(x) if j >= 0]
+    return matches, list(np.where(x < 0)[0]), list(np.where(y < 0)[0])
+
+
+# ---------------------------------
+# Tracks
+# ---------------------------------
+TRACKED, LOST, REMOVED = 0, 1, 2
+
+
+class Track:
+    __slots__ = ("mean", "cov", "box", "score", "idx", "track_id", "state",
+                 "is_activated", "frame_id", "start_frame")
+
+    def __init__(self, box, score, idx):
+        self.mean = None
+        self.cov = None
+        self.box = box          # detection box until the Kalman state exists
+        self.score = score
+        self.idx = idx          # row in the detections of the current frame
+        self.track_id = 0
+        self.state = TRACKED
+        self.is_activated = False
+        self.frame_id = 0
+        self.start_frame = 0
+
+    @property
+    def xyxy(self):
+        if self.mean is None:
+            return self.box
+        return xyah_to_xyxy(self.mean[None, :4])[0]
+
+
+def multi_predict(tracks):
+    if not tracks:
+        return
+    mean = np.array([t.mean for t in tracks])
+    cov = np.array([t.cov for t in tracks])
+    # lost tracks keep their position but no longer grow in height
+    mean[[t.state != TRACKED for t in tracks], 7] = 0
+    mean, cov = kf_predict(mean, cov)
+    for t, m, c in zip(tracks, mean, cov):
+        t.mean, t.cov = m, c
+
+
+def multi_update(pairs, frame_id):
+    """Kalman update of matched (track, detection) pairs in one batch"""
+    if not pairs:
+        return
+    tracks = [t for t, _ in pairs]
+    mean = np.array([t.mean for t in tracks])
+    cov = np.array([t.cov for t in tracks])
+    mean, cov = kf_update(mean, cov, xyxy_to_xyah(np.array([d.box for _, d in pairs])))
+
+    for (t, d), m, c in zip(pairs, mean, cov):
+        t.mean, t.cov = m, c
+        t.state = TRACKED
+        t.is_activated = True
+        t.frame_id = frame_id
+        t.score = d.score
+        t.idx = d.idx
+
+
+def joint(a, b):
+    ids = {t.track_id for t in a}
+    return a + [t for t in b if t.track_id not in ids]
+
+
+def subtract(a, b):
+    ids = {t.track_id for t in b}
+    return [t for t in a if t.track_id not in ids]
+
+
+def remove_duplicates(a, b):
+    dist = iou_distance(a, b)
+    drop_a, drop_b = set(), set()
+    for p, q in zip(*np.where(dist < 0.15)):
+        if a[p].frame_id - a[p].start_frame > b[q].frame_id - b[q].start_frame:
+            drop_b.add(q)
+        else:
+            drop_a.add(p)
+    return ([t for i, t in enumerate(a) if i not in drop_a],
+            [t for i, t in enumerate(b) if i not in drop_b])
+
+
+class ByteTracker:
+    """
+    ByteTrack state of one camera
+
+        tracker = ByteTracker(load_tracker_config())
+        tracks = tracker.update(xyxy, scores)   # (K, 7): x1 y1 x2 y2 id score idx
+
+    idx is the row of the detection each track was matched to on this frame.
+    """
+
+    def __init__(self, cfg, frame_rate=30):
+        self.track_high_thresh = cfg["track_high_thresh"]
+        self.track_low_thresh = cfg["track_low_thresh"]
+        self.new_track_thresh = cfg["new_track_thresh"]
+        self.match_thresh = cfg["match_thresh"]
+        self.fuse_score = cfg.get("fuse_score", True)
+        self.max_time_lost = int(frame_rate / 30.0 * cfg["track_buffer"])
+
+        self.tracked = []
+        self.lost = []
+        self.frame_id = 0
+        self.next_id = 1
+
+    def activate(self, tracks):
+        if not tracks:
+            return
+        mean, cov = kf_initiate(xyxy_to_xyah(np.array([t.box for t in tracks])))
+        for t, m, c in zip(tracks, mean, cov):
+            t.mean, t.cov = m, c
+            t.track_id = self.next_id
+            self.next_id += 1
+            t.state = TRACKED
+            # only tracks of the very first frame are confirmed right away
+            t.is_activated = self.frame_id == 1
+            t.frame_id = self.frame_id
+            t.start_frame = self.frame_id
+
+    def update(self, xyxy, scores):
+        self.frame_id += 1
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+
+        # boxes with no area would give an infinite aspect ratio
+        valid = (xyxy[:, 2] > xyxy[:, 0]) & (xyxy[:, 3] > xyxy[:, 1])
+        high = np.flatnonzero(valid & (scores >= self.track_high_thresh))
+        low = np.flatnonzero(valid & (scores > self.track_low_thresh) & (scores < self.track_high_thresh))
+        detections = [Track(xyxy[i], float(scores[i]), int(i)) for i in high]
+        detections_second = [Track(xyxy[i], float(scores[i]), int(i)) for i in low]
+
+        unconfirmed = [t for t in self.tracked if not t.is_activated]
+        confirmed = [t for t in self.tracked if t.is_activated]
+        pool = joint(confirmed, self.lost)
+        multi_predict(pool)
+
+        activated, refind, lost, removed = [], [], [], []
+
+        # 1. high score detections vs confirmed and lost tracks
+        dists = iou_distance(pool, detections)
+        if self.fuse_score:
+            dists = fuse_score(dists, detections)
+        matches, u_track, u_detection = linear_assignment(dists, self.match_thresh)
+        pairs = [(pool[i], detections[j]) for i, j in matches]
+        for track, _ in pairs:
+            (activated if track.state == TRACKED else refind).append(track)
+
+        # 2. low score detections vs the tracked ones left over
+        remaining = [pool[i] for i in u_track if pool[i].state == TRACKED]
+        dists = iou_distance(remaining, detections_second)
+        matches, u_remaining, _ = linear_assignment(dists, 0.5)
+        for i, j in matches:
+            pairs.append((remaining[i], detections_second[j]))
+            activated.append(remaining[i])
+        multi_update(pairs, self.frame_id)
+
+        for i in u_remaining:
+            track = remaining[i]
+            track.state = LOST
+            lost.append(track)
+
+        # 3. tracks born on the last frame vs the high score detections left over
+        detections = [detections[i] for i in u_detection]
+        dists = iou_distance(unconfirmed, detections)
+        if self.fuse_score:
+            dists = fuse_score(dists, detections)
+        matches, u_unconfirmed, u_detection = linear_assignment(dists, 0.7)
+        multi_update([(unconfirmed[i], detections[j]) for i, j in matches], self.frame_id)
+        activated.extend(unconfirmed[i] for i, _ in matches)
+        for i in u_unconfirmed:
+            unconfirmed[i].state = REMOVED
+            removed.append(unconfirmed[i])
+
+        # 4. new tracks
+        new = [detections[i] for i in u_detection if detections[i].score >= self.new_track_thresh]
+        self.activate(new)
+        activated.extend(new)
+
+        # 5. drop tracks lost for longer than track_buffer
+        for track in self.lost:
+            if self.frame_id - track.frame_id > self.max_time_lost:
+                track.state = REMOVED
+                removed.append(track)
+
+        self.tracked = [t for t in self.tracked if t.state == TRACKED]
+        self.tracked = joint(self.tracked, activated)
+        self.tracked = joint(self.tracked, refind)
+        self.lost = subtract(self.lost, self.tracked)
+        self.lost.extend(lost)
+        self.lost = subtract(self.lost, removed)
+        self.tracked, self.lost = remove_duplicates(self.tracked, self.lost)
+
+        output = [t for t in self.tracked if t.is_activated]
+        if not output:
+            return np.zeros((0, 7), dtype=np.float32)
+
+        boxes = xyah_to_xyxy(np.array([t.mean[:4] for t in output]))
+        return np.concatenate([
+            boxes,
+            np.array([[t.track_id, t.score, t.idx] for t in output])
+        ], axis=1)
@@ -0,0 +1,130 @@
+import json
+
+
+def parse_analytics_config(value):
+    """Read the Cameras.AnalyticsConfig JSON column, empty dict when not set"""
+    if value is None:
+        return {}
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        value = value.strip()
+        if not value or value.upper() in ("NA", "NULL"):
+            return {}
+        value = json.loads(value)
+    if not isinstance(value, dict):
+        raise ValueError(f"AnalyticsConfig must be a JSON object, got {value!r}")
+    return value
+
+
+def motion_settings(defaults, analytics_config):
+    """config.json "motion" section overridden by AnalyticsConfig["motion"]"""
+    settings = dict(defaults)
+    settings.update(analytics_config.get("motion", {}))
+    return settings
+
+
+def inference_settings(defaults, analytics_config):
+    """
+    Effective inference settings of one camera
+
+    defaults is config.json "params", AnalyticsConfig["inference"] may
+    override imgsz, person_conf_threshold, keypoint_conf_threshold and
+    min_visible_keypoints. Raises ValueError for invalid values.
+    """
+    overrides = analytics_config.get("inference", {})
+    unknown = set(overrides) - {"imgsz", "person_conf_threshold",
+                                "keypoint_conf_threshold", "min_visible_keypoints"}
+    if unknown:
+        raise ValueError(f"Unknown inference settings: {sorted(unknown)}")
+
+    settings = {
+        "imgsz": overrides.get("imgsz", defaults["imgsz"]),
+        "person_conf": overrides.get("person_conf_threshold", defaults["person_conf_threshold"]),
+        "keypoint_conf": overrides.get("keypoint_conf_threshold", defaults["keypoint_conf_threshold"]),
+        "min_visible_kpts": overrides.get("min_visible_keypoints", defaults["min_visible_keypoints"])
+    }
+
+    imgsz = settings["imgsz"]
+    if not isinstance(imgsz, int) or imgsz % 32 or not 160 <= imgsz <= 1920:
+        raise ValueError(f"imgsz must be a multiple of 32 between 160 and 1920, got {imgsz!r}")
+
+    for key in ("person_conf", "keypoint_conf"):
+        value = settings[key]
+        if not isinstance(value, (int, float)) or not 0.0 <= value <= 1.0:
+            raise ValueError(f"{key} must be between 0 and 1, got {value!r}")
+
+    kpts = settings["min_visible_kpts"]
+    if not isinstance(kpts, int) or not 0 <= kpts <= 17:
+        raise ValueError(f"min_visible_keypoints must be between 0 and 17, got {kpts!r}")
+
+    return settings
+
+
+# rule thresholds and where their defaults live in config.json
+RULE_DEFAULTS = {
+    "min_fall_speed": ("params", "min_fall_speed"),
+    "confirmation_frames": ("params", "confirmation_frames"),
+    "height_drop_ratio": ("thresholds", "bbox", "height_drop_ratio"),
+    "width_increase_ratio": ("thresholds", "bbox", "width_increase_ratio"),
+    "height_drop": ("thresholds", "keypoint", "height_drop"),
+    "alert_reset_second": ("alert", "alert_reset_second")
+}
+
+
+def rule_settings(config, analytics_config):
+    """
+    Effective fall rule thresholds of one camera
+
+    Defaults come from config.json (see RULE_DEFAULTS), AnalyticsConfig["rules"]
+    may override any of them. Raises ValueError for invalid values.
+    """
+    overrides = analytics_config.get("rules", {})
+    unknown = set(overrides) - set(RULE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown rule settings: {sorted(unknown)}")
+
+    settings = {}
+    for key, path in RULE_DEFAULTS.items():
+        value = config
+        for part in path:
+            value = value[part]
+        settings[key] = overrides.get(key, value)
+
+    for key, value in settings.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"{key} must be a number >= 0, got {value!r}")
+
+    frames = settings["confirmation_frames"]
+    if not isinstance(frames, int) or frames < 1:
+        raise ValueError(f"confirmation_frames must be an integer >= 1, got {frames!r}")
+
+    if not 0.0 < settings["height_drop_ratio"] <= 1.0:
+        raise ValueError(f"height_drop_ratio must be between 0 and 1, got {settings['height_drop_ratio']!r}")
+
+    if settings["width_increase_ratio"] < 1.0:
+        raise ValueError(f"width_increase_ratio must be >= 1, got {settings['width_increase_ratio']!r}")
+
+    return settings
+
+
+def camera_settings(config, analytics_config):
+    """
+    Everything configurable per camera: config.json merged with AnalyticsConfig
+
+    Returns {"inference": ..., "motion": ..., "rules": ...}, raises ValueError
+    when a value is invalid.
+    """
+    motion = motion_settings(config["motion"], analytics_config)
+    ratio = motion["min_area_ratio"]
+    if not isinstance(ratio, (int, float)) or not 0.0 < ratio <= 1.0:
+        raise ValueError(f"motion min_area_ratio must be between 0 and 1, got {ratio!r}")
+    heartbeat = motion["heartbeat_seconds"]
+    if not isinstance(heartbeat, (int, float)) or heartbeat < 0:
+        raise ValueError(f"motion heartbeat_seconds must be >= 0, got {heartbeat!r}")
+
+    return {
+        "inference": inference_settings(config["params"], analytics_config),
+        "motion": motion,
+        "rules": rule_settings(config, analytics_config)
+    }
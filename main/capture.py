@@ -0,0 +1,189 @@
+import logging
+import os
+import threading
+import time
+from supervisor import Backoff, open_stream
+
+logger = logging.getLogger(__name__)
+
+
+class FrameGrabber:
+    """
+    Decode a stream on its own thread and hand out only the newest frame
+
+    The stream is opened on the capture thread with a timeout and reopened
+    with exponential backoff whenever it fails, so the processing side (model,
+    tracks, fall memory) survives camera outages. Local video files are not
+    reopened once they end and never drop frames.
+    """
+
+    def __init__(self, source, drop_stale=True, open_timeout_ms=5000,
+                 backoff_initial=1.0, backoff_max=30.0, metrics=None):
+        self.source = source
+        # optional metrics.CameraMetrics, gets the "decode" timings
+        self.metrics = metrics
+        self.open_timeout_ms = open_timeout_ms
+        self.backoff = Backoff(backoff_initial, backoff_max)
+        self.is_file = os.path.isfile(str(source))
+        # a file decodes faster than realtime, dropping would hand the rules
+        # an arbitrary subset of it; every frame is processed like before
+        self.drop_stale = drop_stale and not self.is_file
+
+        self.cap = None
+        self.lock = threading.Condition()
+        self.thread = None
+        self.running = False
+
+        # latest decoded frame and its capture timestamp
+        self.frame = None
+        self.frame_time = None
+        self.frame_seq = 0
+        self.last_seq = 0
+        self.ended = False
+
+        # counters
+        self.decoded = 0
+        self.dropped = 0
+        self.processed = 0
+
+        # connection state
+        self.connected = False
+        self.connected_since = None
+        self.reconnects = 0
+        self.started = time.time()
+        self.uptime_total = 0.0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._reader, daemon=True)
+        self.thread.start()
+        return self
+
+    def _connect(self):
+        """Open the stream, retrying with backoff. Returns False when stopped"""
+        while self.running:
+            cap = open_stream(self.source, self.open_timeout_ms)
+            if cap is not None:
+                with self.lock:
+                    self.cap = cap
+                    self.connected = True
+                    self.connected_since = time.time()
+                self.backoff.reset()
+                return True
+
+            if self.is_file:
+                return False
+
+            delay = self.backoff.next()
+            logger.warning("Could not open %s, retrying in %.0fs", self.source, delay)
+            time.sleep(delay)
+
+        return False
+
+    def _disconnect(self):
+        with self.lock:
+            if self.connected:
+                self.uptime_total += time.time() - self.connected_since
+            self.connected = False
+            self.connected_since = None
+            cap, self.cap = self.cap, None
+        if cap is not None:
+            cap.release()
+
+    def _reader(self):
+        while self.running:
+            if self.cap is None:
+                if not self._connect():
+                    break
+
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            now = time.time()
+            if ret and self.metrics is not None:
+                self.metrics.observe("decode", time.perf_counter() - start)
+
+            if not ret:
+                self._disconnect()
+                if self.is_file:
+                    break
+                self.reconnects += 1
+                delay = self.backoff.next()
+                logger.warning("Stream %s lost, reconnecting in %.0fs", self.source, delay)
+                time.sleep(delay)
+                continue
+
+            with self.lock:
+                self.decoded += 1
+
+                # previous frame was never handed out -> it is stale
+                if self.frame is not None and self.frame_seq != self.last_seq:
+                    if self.drop_stale:
+                        self.dropped += 1
+                    else:
+                        # keep every frame: wait until the consumer took it
+                        while self.running and self.frame_seq != self.last_seq:
+                            self.lock.wait(0.1)
+
+                self.frame = frame
+                self.frame_time = now
+                self.frame_seq += 1
+                self.lock.notify_all()
+
+        self._disconnect()
+        with self.lock:
+            self.ended = True
+            self.lock.notify_all()
+
+    def read(self, timeout=None):
+        """
+        Block until a frame newer than the last one returned is available
+
+        Returns:
+            (ret, frame, timestamp) - ret is False on timeout (e.g. while
+            reconnecting) or once the stream has ended, see self.ended
+        """
+        with self.lock:
+            deadline = None if timeout is None else time.time() + timeout
+
+            while self.frame_seq == self.last_seq and not self.ended:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False, None, None
+                self.lock.wait(remaining)
+
+            if self.frame_seq == self.last_seq:
+                return False, None, None
+
+            self.last_seq = self.frame_seq
+            self.processed += 1
+            frame, frame_time = self.frame, self.frame_time
+            self.lock.notify_all()
+
+        return True, frame, frame_time
+
+    def stats(self):
+        with self.lock:
+            uptime = self.uptime_total
+            if self.connected:
+                uptime += time.time() - self.connected_since
+
+            return {
+                "decoded": self.decoded,
+                "dropped": self.dropped,
+                "processed": self.processed,
+                "behind": self.decoded - self.dropped - self.processed,
+                "connected": self.connected,
+                "reconnects": self.reconnects,
+                "uptime": uptime,
+                "availability": uptime / max(1e-6, time.time() - self.started)
+            }
+
+    def release(self):
+        self.running = False
+        with self.lock:
+            self.lock.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        # a reader still blocked in cap.read() releases the capture itself
+        if self.thread is None or not self.thread.is_alive():
+            self._disconnect()
@@ -0,0 +1,156 @@
+import cv2
+import logging
+import os
+import queue
+import threading
+import time
+from frame_buffer import decode_frames
+from snapshot import make_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class ClipWriterPool:
+    """
+    Encode alert clips and persist alerts on background threads
+
+    The capture loop only hands over a job descriptor with the encoded
+    frames and the people of the alert frame; the overlay of the snapshot
+    is drawn here by renderer (overlay.OverlayRenderer). The queue is
+    bounded: when it is full submit() blocks, and the time spent blocked is
+    reported as backpressure.
+    """
+
+    def __init__(self, clip_folder, persist_alert, workers=2, queue_size=8, snapshot_params=None,
+                 metrics=None, renderer=None):
+        self.clip_folder = clip_folder
+        # optional metrics.CameraMetrics, gets "snapshot" and "clip_encode" timings
+        self.metrics = metrics
+        self.persist_alert = persist_alert
+        self.snapshot_params = snapshot_params or {}
+        self.renderer = renderer
+        self.jobs = queue.Queue(maxsize=queue_size)
+
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+
+        self.threads = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(workers)
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, alert_id, camera_id, snapshot_frame, frames, fps, detections=None, statuses=None):
+        """
+        Queue a clip + alert job, frames are the encoded frames of the clip
+
+        detections (DetectionBatch) and statuses of the alert frame are drawn
+        on snapshot_frame before it is encoded.
+        """
+        job = {
+            "alert_id": alert_id,
+            "camera_id": camera_id,
+            "snapshot_frame": snapshot_frame,
+            "detections": detections,
+            "statuses": statuses,
+            "frames": frames,
+            "fps": fps
+        }
+
+        start = time.time()
+        self.jobs.put(job)
+        waited = time.time() - start
+
+        with self.lock:
+            self.submitted += 1
+            self.blocked_seconds += waited
+            self.max_depth = max(self.max_depth, self.jobs.qsize())
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                break
+
+            try:
+                self.write_job(job)
+                with self.lock:
+                    self.completed += 1
+            except Exception as e:
+                logger.error("Clip job %s failed: %s", job["alert_id"], e)
+                with self.lock:
+                    self.failed += 1
+            finally:
+                self.jobs.task_done()
+
+    def write_job(self, job):
+        alert_id = job["alert_id"]
+
+        start = time.perf_counter()
+        snapshot_frame = job["snapshot_frame"]
+        if self.renderer is not None and job["detections"] is not None:
+            snapshot_frame = self.renderer.draw(snapshot_frame, job["detections"], job["statuses"])
+        snapshot_64, thumbnail = make_snapshot(snapshot_frame, **self.snapshot_params)
+        self.observe("snapshot", time.perf_counter() - start)
+        with open(os.path.join(self.clip_folder, f"{alert_id}_thumb.jpg"), "wb") as f:
+            f.write(thumbnail)
+
+        start = time.perf_counter()
+        frames = decode_frames(job["frames"])
+        first_frame = next(frames, None)
+
+        if first_frame is not None:
+            h, w, _ = first_frame.shape
+            clip_path = os.path.join(self.clip_folder, f"{alert_id}.mp4")
+
+            out = cv2.VideoWriter(
+                clip_path,
+                cv2.VideoWriter_fourcc(*"mp4v"),
+                job["fps"],
+                (w, h)
+            )
+
+            out.write(first_frame)
+            for f in frames:
+                out.write(f)
+            out.release()
+            self.observe("clip_encode", time.perf_counter() - start)
+
+        else:
+            clip_path = None
+            logger.warning("No frames for clip %s", alert_id)
+
+        self.persist_alert(
+            alert_id=alert_id,
+            camera_id=job["camera_id"],
+            snapshot_64=snapshot_64,
+            clip_path=clip_path
+        )
+
+    def observe(self, stage, seconds):
+        if self.metrics is not None:
+            self.metrics.observe(stage, seconds)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": self.jobs.qsize(),
+                "max_queued": self.max_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "blocked_seconds": round(self.blocked_seconds, 3)
+            }
+
+    def shutdown(self):
+        """Finish every pending job, then stop the workers"""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for t in self.threads:
+            t.join()
@@ -1,10 +1,9 @@
 import mysql.connector
 import uuid
-import json
+from app_config import load_config
 from contextlib import contextmanager
 
-with open("/home/asadel/ASADEL PROJECTS/Fall_Detection/main/config.json", "r") as f:
-    config = json.load(f)
+config = load_config()
 
 DB_CONFIG = config['database']
 
@@ -29,7 +28,7 @@ def get_active_cameras():
         cursor = conn.cursor(dictionary=True)
         try:
             cursor.execute("""
-                SELECT CameraId, CameraName, RTSPUrl
+                SELECT CameraId, CameraName, RTSPUrl, Roi, AnalyticsConfig
                 FROM Cameras
                 WHERE Status = 'true'
                 """)
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class DetectionBatch:
+    """
+    Tracked people of one frame as columns
+
+        ids      (P,)        track ids
+        boxes    (P, 4)      xyxy
+        kpts     (P, 17, 2)  keypoints (smoothed once through the Kalman filter)
+        conf     (P, 17)     keypoint confidences
+        visible  (P, 17)     keypoints above the keypoint confidence threshold
+
+    Iterating yields (id, kpts, box) per person as views into the columns.
+    """
+
+    __slots__ = ("ids", "boxes", "kpts", "conf", "visible")
+
+    def __init__(self, ids, boxes, kpts, conf, visible=None):
+        self.ids = ids
+        self.boxes = boxes
+        self.kpts = kpts
+        self.conf = conf
+        self.visible = visible
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0,), dtype=int),
+                   np.zeros((0, 4), dtype=np.float32),
+                   np.zeros((0, 17, 2), dtype=np.float32),
+                   np.zeros((0, 17), dtype=np.float32),
+                   np.zeros((0, 17), dtype=bool))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for i, track_id in enumerate(self.ids.tolist()):
+            yield track_id, self.kpts[i], self.boxes[i]
+
+    def select(self, mask):
+        """Rows of mask (bool mask or index array) as a new batch"""
+        return DetectionBatch(
+            self.ids[mask],
+            self.boxes[mask],
+            self.kpts[mask],
+            self.conf[mask],
+            None if self.visible is None else self.visible[mask]
+        )
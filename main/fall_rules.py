@@ -1,288 +1,277 @@
+import logging
 import numpy as np
-from collections import deque
-import json
+from app_config import load_config
+from camera_settings import rule_settings
+from logs import TraceRing
 import time 
 
-# Load config.json
-with open("/home/asadel/ASADEL PROJECTS/Fall_Detection/main/config.json", "r") as f:
-    config = json.load(f)
+config = load_config()
+logger = logging.getLogger(__name__)
 
 # Paths
+# N and M size the per-track buffers, changing them needs a restart
 N = config["params"]["frames_per_velocity"]  
 M = config["params"]["velocity_history_length"]
 memory_frames = N * M
 
-height_drop_ratio = config["thresholds"]["bbox"]["height_drop_ratio"]
-width_increase_ratio = config["thresholds"]["bbox"]["width_increase_ratio"]
-
 bent_angle = config["thresholds"]["keypoint"]["bent_posture_angle"]
-height_drop_kp = config["thresholds"]["keypoint"]["height_drop"]
 head_inversion_threshold = config["thresholds"]["posture"]["head_inversion_threshold"]
 
-# NEW: Fall velocity thresholds
-MIN_FALL_SPEED = config['params']['min_fall_speed']  # pixels/second - minimum downward speed
-CONFIRMATION_FRAMES = config["params"]["confirmation_frames"]  # Number of consecutive frames to confirm fall
-ALERT_RESET_SECONDS = config["alert"]["alert_reset_second"]
-
-def debug_velocity(camera_id, camera_name, person_id, feats, vel_list, frame_count, fps, N, M):
-    """Simplified debug function"""
-    print("\n" + "="*60)
-    print(f"DEBUG for Camera {camera_id}:{camera_name} Person {person_id} - Frame {frame_count}")
-    print("="*60)
-    
-    # 1. Frame timing
-    print(f"\n1. TIMING:")
-    print(f"   Total frames: {frame_count}")
-    print(f"   Frames stored: {len(feats)}")
-    print(f"   Should compute at: {N}, {2*N}, {3*N}...")
-    print(f"   frame_count % N = {frame_count % N}")
-    
-    
-    # 3. Velocity list
-    print(f"\n3. STORED VELOCITIES (M={M}):")
-    if len(vel_list) > 0:
-        for i, v in enumerate(vel_list):
-            direction = "↓" if v > 0 else "↑" if v < 0 else "→"
-            print(f"   v{i+1}: {v:7.1f} px/s {direction}")
-        
-        if len(vel_list) >= M:
-            recent_vels = vel_list[-M:]
-            print(f"\n4. FALL VELOCITY CHECK (last {M}):")
-            print(f"   Velocities: {[f'{v:.1f}' for v in recent_vels]}")
-            
-            avg_vel = np.mean(recent_vels)
-            max_vel = max(recent_vels)
-
-            print(f"   Average velocity: {avg_vel:.1f} px/s")
-            print(f"   Max velocity: {max_vel:.1f} px/s")
-            print(f"   Rapid downward: {avg_vel > MIN_FALL_SPEED and max_vel > MIN_FALL_SPEED}")
-    else:
-        print("No velocities stored yet")
-                    
-    print("="*60 + "\n")
-
-def get_angle(p1, p2):
-    dx, dy = p2[0] - p1[0], p2[1] - p1[1]
-    return np.degrees(np.arctan2(abs(dx), abs(dy)))
-
-def compute_features(kpts, box):
-    nose = kpts[0]
-    left_shoulder, right_shoulder = kpts[5], kpts[6]
-    left_hip, right_hip = kpts[11], kpts[12]
-    left_ankle, right_ankle = kpts[15], kpts[16]
-
-    shoulder_mid = np.mean([left_shoulder, right_shoulder], axis=0)
-    hip_mid = np.mean([left_hip, right_hip], axis=0)
-    ankle_mid = np.mean([left_ankle, right_ankle], axis=0)
-
-    torso_angle = get_angle(shoulder_mid, hip_mid)
-    body_height = np.linalg.norm(nose - ankle_mid)
-    head_vs_ankle = nose[1] - ankle_mid[1]  # Negative when standing, positive when head below feet
-
-    x1, y1, x2, y2 = box
-    bbox_h = y2 - y1
-    bbox_w = x2 - x1
-    bbox_cy = (y1 + y2) / 2
-
-    return {
-        "torso_angle": torso_angle,
-        "body_height": body_height,
-        "head_vs_ankle": head_vs_ankle,
-        "nose_y": nose[1],
-        "ankle_y": ankle_mid[1],
-        "bbox_h": bbox_h,
-        "bbox_w": bbox_w,
-        "bbox_cy": bbox_cy
-    }
-
-def check_rapid_downward_movement(velocities, min_speed=MIN_FALL_SPEED):
+# columns of the per-frame history
+BBOX_CY, BBOX_H, BBOX_W, BODY_HEIGHT = range(4)
+
+
+def compute_features(kpts, boxes):
+    """
+    Per-frame features of all people at once
+
+    kpts (P, 17, 2), boxes (P, 4) xyxy. Returns the history columns
+    (P, 4) and head_vs_ankle (P,), which is negative when standing and
+    positive when the head is below the feet.
     """
-    Check if velocities indicate falling (rapid downward movement with acceleration)
-    
-    Args:
-        velocities: List of downward velocities (positive = downward in image coords)
-        min_speed: Minimum average speed to consider fall (px/s)
-        min_accel: Minimum acceleration to consider fall (px/s²)
-    
-    Returns:
-        True if movement indicates a fall
+    kpts = np.asarray(kpts, dtype=float)
+    boxes = np.asarray(boxes, dtype=float)
+
+    nose = kpts[:, 0]
+    ankle_mid = (kpts[:, 15] + kpts[:, 16]) / 2
+
+    feats = np.empty((len(kpts), 4))
+    feats[:, BBOX_CY] = (boxes[:, 1] + boxes[:, 3]) / 2
+    feats[:, BBOX_H] = boxes[:, 3] - boxes[:, 1]
+    feats[:, BBOX_W] = boxes[:, 2] - boxes[:, 0]
+    feats[:, BODY_HEIGHT] = np.linalg.norm(nose - ankle_mid, axis=1)
+
+    return feats, nose[:, 1] - ankle_mid[:, 1]
+
+
+class FallMemory:
+    """
+    Rule state of every track in preallocated arrays
+
+    Each track owns a row: ring buffers of its last N*M frame features and
+    M velocities plus the confirmation / alert counters. Frame k of a track
+    is stored at column k % N*M, so feats[-i] is at (frame_count - i). Rows
+    are reused after pop(), register pop with TrackRegistry.on_evict.
+    trace keeps the per-frame rule details that are logged with an alert.
+    settings are the thresholds (camera_settings.rule_settings), replace
+    them to apply a config reload.
+    """
+
+    __slots__ = ("frames", "vel", "frame_count", "vel_count", "fall_frames",
+                 "alert_sent", "alert_time", "indicators", "slots", "free", "trace", "settings")
+
+    def __init__(self, capacity=16, settings=None):
+        self.settings = rule_settings(config, {}) if settings is None else settings
+        self.trace = TraceRing()
+        self.frames = np.zeros((capacity, memory_frames, 4))
+        self.vel = np.zeros((capacity, M))
+        self.frame_count = np.zeros(capacity, dtype=np.int64)
+        self.vel_count = np.zeros(capacity, dtype=np.int64)
+        self.fall_frames = np.zeros(capacity, dtype=np.int64)
+        self.alert_sent = np.zeros(capacity, dtype=bool)
+        self.alert_time = np.zeros(capacity)
+        self.indicators = [[] for _ in range(capacity)]    # of the last fall-like frame
+        self.slots = {}     # track id -> row
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def __contains__(self, track_id):
+        return track_id in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        capacity = len(self.frame_count)
+        for name in ("frames", "vel", "frame_count", "vel_count", "fall_frames", "alert_sent", "alert_time"):
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+        self.indicators.extend([] for _ in range(capacity))
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(self, track_id):
+        if not self.free:
+            self._grow()
+        row = self.free.pop()
+        self.slots[track_id] = row
+        self.frame_count[row] = 0
+        self.vel_count[row] = 0
+        self.fall_frames[row] = 0
+        self.alert_sent[row] = False
+        self.alert_time[row] = 0
+        self.indicators[row] = []
+        return row
+
+    def pop(self, track_id, default=None):
+        row = self.slots.pop(track_id, None)
+        if row is None:
+            return default
+        self.free.append(row)
+        return row
+
+    def rows(self, track_ids):
+        return np.fromiter(
+            (self.slots[t] if t in self.slots else self.add(t) for t in track_ids),
+            dtype=int,
+            count=len(track_ids)
+        )
+
+    def indicators_of(self, track_id):
+        return self.indicators[self.slots[track_id]]
+
+
+def fall_rule_batch(person_ids, kpts, boxes, fps, fall_memory, camera_id=None, camera_name=None, now=None):
+    """
+    Fall rules for all people of one frame in one vectorized pass
+
+    person_ids (P,), kpts (P, 17, 2), boxes (P, 4), fall_memory a FallMemory.
+    Returns one (status, alert_triggered) per person, same decisions as
+    calling fall_rule_based for each of them. now is the frame time for the
+    alert reset, wall clock when not given (replays pass video time).
     """
-    if len(velocities) < 2:
-        return False
-    
-    # Check recent velocities
-    recent_vels = velocities[-M:] if len(velocities) >= M else velocities
-    
-    # All velocities should be positive (downward movement)
-    if not all(v > 0 for v in recent_vels):
-        return False
-    
-    # Calculate metrics
-    avg_velocity = np.mean(recent_vels)
-    max_velocity = max(recent_vels)
-    
-    # Fall criteria: fast downward movement
-    is_fast_enough = avg_velocity > min_speed and max_velocity > min_speed
-    
-    return is_fast_enough 
-
-
-
-def fall_rule_based(person_id, kpts, box, fps, fall_memory, camera_id=None, camera_name=None):
-
-    feat = compute_features(kpts, box)
-
-    if person_id not in fall_memory:
-        fall_memory[person_id] = {
-            "frames": deque(maxlen=memory_frames),
-            "vel": deque(maxlen=M),
-            "frame_count": 0,
-            "fall_frames": 0,  # Count consecutive fall detections
-            "alert_sent": False,  # Track if alert already sent
-            "alert_time":0
-        }
-
-    fall_memory[person_id]["frame_count"] += 1
-    frame_count = fall_memory[person_id]["frame_count"]
-    
-    fall_memory[person_id]["frames"].append(feat)
-    feats = list(fall_memory[person_id]["frames"])
-
-    if len(feats) < N+1:
-        return "NORMAL", False
-    
+    if now is None:
+        now = time.time()
+
+    person_ids = np.asarray(person_ids).tolist()
+    count = len(person_ids)
+    if count == 0:
+        return []
+
+    rules = fall_memory.settings
+    min_fall_speed = rules["min_fall_speed"]  # pixels/second - minimum downward speed
+    confirmation_frames = rules["confirmation_frames"]  # consecutive frames to confirm a fall
+
+    feats, head_vs_ankle = compute_features(kpts, boxes)
+
+    rows = fall_memory.rows(person_ids)
+    fall_memory.frame_count[rows] += 1
+    frame_count = fall_memory.frame_count[rows]
+    fall_memory.frames[rows, (frame_count - 1) % memory_frames] = feats
+
+    def history(i):
+        """Features of i frames ago (i = 1 is the current frame)"""
+        return fall_memory.frames[rows, (frame_count - i) % memory_frames]
+
+    stored = np.minimum(frame_count, memory_frames)
+    ready = stored >= N + 1
+
     # ------------------------------------------------------------
     # 1. VELOCITY COMPUTATION (every N frames)
     # ------------------------------------------------------------
-    if frame_count % N == 0 and len(feats) >= N+1:
-        old_y = feats[-N-1]["bbox_cy"]
-        new_y = feats[-1]["bbox_cy"]
-        # Positive velocity = downward movement (Y increases downward in image)
-        velocity = (new_y - old_y) / (N / fps)
-        
-        fall_memory[person_id]["vel"].append(velocity)
-
-        print(f"\n[VELOCITY COMPUTED AT FRAME {frame_count}]")
-        print(f"  Old Y: {old_y:.1f}, New Y: {new_y:.1f}")
-        print(f"  Change: {new_y - old_y:.1f} pixels")
-        print(f"  Velocity: {velocity:.1f} px/s ({'DOWNWARD' if velocity > 0 else 'UPWARD'})")
+    prev_feat = history(N + 1)
+    velocity_step = ready & (frame_count % N == 0)
+    # Positive velocity = downward movement (Y increases downward in image)
+    velocity = (feats[:, BBOX_CY] - prev_feat[:, BBOX_CY]) / (N / fps)
+
+    step_rows = rows[velocity_step]
+    fall_memory.vel_count[step_rows] += 1
+    fall_memory.vel[step_rows, (fall_memory.vel_count[step_rows] - 1) % M] = velocity[velocity_step]
 
     # ------------------------------------------------------------
-    # 2. DEBUG PRINT (with updated velocities)
-    # ------------------------------------------------------------
-    if frame_count % N == 0:
-        vel_list = list(fall_memory[person_id]["vel"])
-        debug_velocity(camera_id, camera_name, person_id, feats, vel_list, frame_count, fps, N, M)
-    
-    # ------------------------------------------------------------
-    # 3. CHECK VELOCITY FOR RAPID DOWNWARD MOVEMENT
+    # 2. CHECK VELOCITY FOR RAPID DOWNWARD MOVEMENT
     # ------------------------------------------------------------
-    vel_list = list(fall_memory[person_id]["vel"])
-    rapid_downward = False
-    
-    if len(vel_list) >= M:
-        rapid_downward = check_rapid_downward_movement(vel_list)
-        
+    # last M velocities, oldest first
+    vel_count = fall_memory.vel_count[rows]
+    vels = fall_memory.vel[rows[:, None], (vel_count[:, None] - M + np.arange(M)) % M]
+
+    rapid_downward = np.zeros(count, dtype=bool)
+    if M >= 2:
+        rapid_downward = (
+            (vel_count >= M)
+            & np.all(vels > 0, axis=1)
+            & (vels.mean(axis=1) > min_fall_speed)
+            & (vels.max(axis=1) > min_fall_speed)
+        )
+
     # ------------------------------------------------------------
-    # 4. BBOX COLLAPSE CHECK
+    # 3. BBOX COLLAPSE CHECK
     # ------------------------------------------------------------
-    curr_feat = feats[-1]
-    prev_feat = feats[-N-1]
-
-    prev_h = prev_feat["bbox_h"]
-    curr_h = curr_feat["bbox_h"]
-    prev_w = prev_feat["bbox_w"]
-    curr_w = curr_feat["bbox_w"]
-
-    height_halved = curr_h < height_drop_ratio * prev_h
-    width_increased = curr_w > width_increase_ratio * prev_w
-    height_dropping = height_halved or width_increased
-    
+    height_halved = feats[:, BBOX_H] < rules["height_drop_ratio"] * prev_feat[:, BBOX_H]
+    width_increased = feats[:, BBOX_W] > rules["width_increase_ratio"] * prev_feat[:, BBOX_W]
+    height_dropping = height_halved | width_increased
+
     # ------------------------------------------------------------
-    # 5. KEYPOINT-BASED CHECKS
+    # 4. KEYPOINT-BASED CHECKS
     # ------------------------------------------------------------
-    heights = [f["body_height"] for f in feats]
-    angles = [f["torso_angle"] for f in feats]
-    
-    rapid_height_loss = False
-    bent_posture = False
-    head_inversion = False
-    
-    # Check if body height dropped significantly
-    if len(heights) >= 5:
-        height_drop = (heights[-5] - heights[-1]) / max(1, heights[-5])
-        rapid_height_loss = height_drop > height_drop_kp
-    
-    
-    # Check if head is below feet (inverted posture)
-    # head_vs_ankle is negative when standing, positive when head below ankles
-    head_inversion = curr_feat["head_vs_ankle"] > 0
-    
+    # body height dropped significantly over the last 5 frames
+    height_5 = history(5)[:, BODY_HEIGHT]
+    height_drop = (height_5 - feats[:, BODY_HEIGHT]) / np.maximum(1, height_5)
+    rapid_height_loss = (stored >= 5) & (height_drop > rules["height_drop"])
+
+    # head below feet (inverted posture)
+    head_inversion = head_vs_ankle > 0
+
     # ------------------------------------------------------------
-    # 6. FALL DECISION - MULTI-CRITERIA WITH CONFIRMATION
+    # 5. FALL DECISION - velocity is mandatory, plus at least one more
+    # indicator, confirmed over consecutive frames
     # ------------------------------------------------------------
-    
-    # Count fall indicators
-    velocity_indicator = rapid_downward
-    other_indicators = []
-    
-    if height_dropping:
-        other_indicators.append("height_dropping")
-
-    if rapid_height_loss:
-        other_indicators.append("rapid_height_loss")
-
-    if head_inversion:
-        other_indicators.append("head_inversion")
-
-    # 2. Apply new rule: velocity is mandatory
-    fall_indicators = 0
-    indicators_detail = []
-
-    # velocity must be present
-    if velocity_indicator:
-        fall_indicators += 1
-        indicators_detail.append("rapid_downward")
-
-    # at least one more indicator from the others
-    if len(other_indicators) >= 1:
-        fall_indicators += 1
-        indicators_detail.extend(other_indicators)
-    
-    alert_triggered = False
-    
-    # CORRECTED LOGIC: Require at least 2 indicators for potential fall
-    if fall_indicators >= 2:
-        fall_memory[person_id]["fall_frames"] += 1
-        
-        # Confirm fall only after consecutive detections
-        if fall_memory[person_id]["fall_frames"] >= CONFIRMATION_FRAMES:
-            current_time = time.time()
-            if (not fall_memory[person_id]["alert_sent"] or
-                (current_time - fall_memory[person_id]["alert_time"] > ALERT_RESET_SECONDS)):
-                
-                fall_memory[person_id]["alert_sent"] = True
-                fall_memory[person_id]["alert_time"] = current_time
-                
-                alert_triggered = True
-                
-                print(f"\n{'='*60}")
-                print(f"  FALL CONFIRMED for Person {person_id}!")
-                print(f"   Indicators: {indicators_detail}")
-                print(f"   Confirmed over {fall_memory[person_id]['fall_frames']} frames")
-                print(f"{'='*60}\n")
-            return "FALLING", alert_triggered
-        else:
-            return "POTENTIAL_FALL", False
-    else:
-        if fall_memory[person_id]["alert_sent"]:
-            if time.time() - fall_memory[person_id]["alert_time"] > ALERT_RESET_SECONDS:
-                fall_memory[person_id]["alert_sent"] = False
-
-        fall_memory[person_id]["fall_frames"] = 0
-        return "NORMAL", False
-    
-
-
-
-    
\ No newline at end of file
+    fall = ready & rapid_downward & (height_dropping | rapid_height_loss | head_inversion)
+    normal = ready & ~fall
+
+    fall_rows = rows[fall]
+    fall_memory.fall_frames[fall_rows] += 1
+    fall_frames = fall_memory.fall_frames[rows]
+    confirmed = fall & (fall_frames >= confirmation_frames)
+
+    alert_sent = fall_memory.alert_sent[rows]
+    alert_expired = now - fall_memory.alert_time[rows] > rules["alert_reset_second"]
+    alert_triggered = confirmed & (~alert_sent | alert_expired)
+
+    alert_rows = rows[alert_triggered]
+    fall_memory.alert_sent[alert_rows] = True
+    fall_memory.alert_time[alert_rows] = now
+
+    reset_rows = rows[normal & alert_sent & alert_expired]
+    fall_memory.alert_sent[reset_rows] = False
+    fall_memory.fall_frames[rows[normal]] = 0
+
+    camera = None if camera_id is None else f"{camera_id}:{camera_name}"
+
+    results = []
+    for i, person_id in enumerate(person_ids):
+        if velocity_step[i]:
+            fall_memory.trace.add(
+                person_id, "frame %d: y %.1f -> %.1f, velocity %.1f px/s, last %s, rapid downward %s",
+                frame_count[i], prev_feat[i, BBOX_CY], feats[i, BBOX_CY], velocity[i],
+                [round(v, 1) for v in vels[i, max(0, M - vel_count[i]):].tolist()], rapid_downward[i]
+            )
+
+        if not fall[i]:
+            results.append(("NORMAL", False))
+            continue
+
+        indicators_detail = ["rapid_downward"]
+        if height_dropping[i]:
+            indicators_detail.append("height_dropping")
+        if rapid_height_loss[i]:
+            indicators_detail.append("rapid_height_loss")
+        if head_inversion[i]:
+            indicators_detail.append("head_inversion")
+        fall_memory.indicators[rows[i]] = indicators_detail
+
+        fall_memory.trace.add(
+            person_id, "frame %d: %s, %d/%d frames",
+            frame_count[i], indicators_detail, fall_frames[i], confirmation_frames
+        )
+
+        if not confirmed[i]:
+            results.append(("POTENTIAL_FALL", False))
+            continue
+
+        if alert_triggered[i]:
+            extra = {"track": person_id, "rate_limit": False}
+            if camera is not None:
+                extra["camera"] = camera
+            logger.warning("Fall confirmed for person %s over %d frames, indicators %s",
+                           person_id, fall_frames[i], indicators_detail, extra=extra)
+            fall_memory.trace.dump(logger, person_id, camera=camera)
+        results.append(("FALLING", bool(alert_triggered[i])))
+
+    return results
+
+
+def fall_rule_based(person_id, kpts, box, fps, fall_memory, camera_id=None, camera_name=None, now=None):
+    """Fall rules for a single person, see fall_rule_batch"""
+    return fall_rule_batch(
+        [person_id], np.asarray(kpts)[None], np.asarray(box)[None], fps, fall_memory,
+        camera_id=camera_id, camera_name=camera_name, now=now
+    )[0]
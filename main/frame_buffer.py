@@ -0,0 +1,134 @@
+import cv2
+import numpy as np
+
+
+class GlobalBudget:
+    """
+    Byte budget shared by the frame buffers of all camera processes
+
+    Every camera books its bytes in its own slot, so the share of a camera
+    process that died without clearing its buffer can be released by the
+    parent (see release) before the camera is started again.
+    """
+
+    def __init__(self, limit_bytes, used, slot):
+        # used is a multiprocessing.Array("q", cameras) created by the parent process
+        self.limit = limit_bytes
+        self.used = used
+        self.slot = slot
+
+    def reserve(self, size):
+        with self.used.get_lock():
+            used = self.used.get_obj()
+            if sum(used) + size > self.limit:
+                return False
+            used[self.slot] += size
+            return True
+
+    def free(self, size):
+        with self.used.get_lock():
+            self.used.get_obj()[self.slot] -= size
+
+    def release(self):
+        """Drop everything booked by this camera"""
+        with self.used.get_lock():
+            self.used.get_obj()[self.slot] = 0
+
+    def total(self):
+        with self.used.get_lock():
+            return sum(self.used.get_obj())
+
+
+class CompressedFrameRing:
+    """
+    Preallocated ring of JPEG encoded frames covering the last max_seconds
+
+    Frames are evicted oldest-first when they fall out of the time window,
+    when the ring is full or when the per-camera or global byte budget is
+    exceeded. Frames are only decoded again when a clip is written.
+    """
+
+    def __init__(self, max_seconds, max_fps, camera_budget_bytes, global_budget=None, quality=80):
+        self.max_seconds = max_seconds
+        self.capacity = int(np.ceil(max_seconds * max_fps)) + 1
+        self.camera_budget = camera_budget_bytes
+        self.global_budget = global_budget
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+
+        self.times = np.zeros(self.capacity, dtype=np.float64)
+        self.data = [None] * self.capacity
+        self.head = 0   # index of the oldest frame
+        self.count = 0
+        self.bytes = 0
+        self.dropped = 0
+
+    def encode(self, frame):
+        ok, buf = cv2.imencode(".jpg", frame, self.encode_params)
+        return buf.tobytes() if ok else None
+
+    def push(self, timestamp, frame):
+        """Encode and store a frame, returns the encoded bytes (None if it was dropped)"""
+        data = self.encode(frame)
+        if data is None:
+            self.dropped += 1
+            return None
+
+        self.push_encoded(timestamp, data)
+        return data
+
+    def push_encoded(self, timestamp, data):
+        size = len(data)
+
+        if size > self.camera_budget:
+            self.dropped += 1
+            return
+
+        # time window
+        while self.count and timestamp - self.times[self.head] > self.max_seconds:
+            self.pop_oldest()
+
+        # slots and per-camera budget
+        while self.count and (self.count == self.capacity or self.bytes + size > self.camera_budget):
+            self.pop_oldest()
+
+        # global budget
+        if self.global_budget is not None:
+            while not self.global_budget.reserve(size):
+                if not self.count:
+                    self.dropped += 1
+                    return
+                self.pop_oldest()
+
+        tail = (self.head + self.count) % self.capacity
+        self.times[tail] = timestamp
+        self.data[tail] = data
+        self.count += 1
+        self.bytes += size
+
+    def pop_oldest(self):
+        size = len(self.data[self.head])
+        self.data[self.head] = None
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        self.bytes -= size
+        if self.global_budget is not None:
+            self.global_budget.free(size)
+
+    def frames(self):
+        """Encoded frames currently held, oldest first"""
+        return [self.data[(self.head + i) % self.capacity] for i in range(self.count)]
+
+    def clear(self):
+        while self.count:
+            self.pop_oldest()
+
+    def stats(self):
+        return {"frames": self.count, "bytes": self.bytes, "dropped": self.dropped}
+
+
+def decode_frames(encoded_frames):
+    """Decode the frames needed for a clip, skipping any that fail"""
+    for data in encoded_frames:
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if frame is not None:
+            yield frame
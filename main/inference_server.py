@@ -0,0 +1,126 @@
+import numpy as np
+import logging
+import queue
+import time
+from multiprocessing import shared_memory
+
+logger = logging.getLogger(__name__)
+
+
+def empty_detections():
+    return (np.zeros((0, 4), dtype=np.float32),
+            np.zeros((0,), dtype=np.float32),
+            np.zeros((0, 17, 2), dtype=np.float32),
+            np.zeros((0, 17), dtype=np.float32))
+
+
+# ---------------------------------
+# Camera side
+# ---------------------------------
+class InferenceClient:
+    """Send frames of one camera to the shared inference server and wait for its detections"""
+
+    def __init__(self, camera_key, request_queue, response_queue, timeout=5.0):
+        self.camera_key = camera_key
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.timeout = timeout
+
+        self.shm = None
+        self.seq = 0
+
+    def _frame_buffer(self, frame):
+        # one shared buffer per camera, re-created only when the frame size grows
+        if self.shm is None or self.shm.size < frame.nbytes:
+            self.close()
+            self.shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        return np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf)
+
+    def infer(self, frame, imgsz, person_conf):
+        self.seq += 1
+        np.copyto(self._frame_buffer(frame), frame)
+
+        self.request_queue.put(
+            (self.camera_key, self.seq, self.shm.name, frame.shape, frame.dtype.str,
+             imgsz, person_conf)
+        )
+
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                seq, detections = self.response_queue.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                logger.warning("Inference server did not answer for %s", self.camera_key)
+                return empty_detections()
+
+            if seq == self.seq:
+                return detections
+            # answer to a request that already timed out, ignore it
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+# ---------------------------------
+# Server side
+# ---------------------------------
+def collect_batch(request_queue, batch_size, batch_timeout):
+    """Wait for one request, then gather more until the batch is full or the deadline passes"""
+    batch = [request_queue.get()]
+    deadline = time.time() + batch_timeout
+
+    while len(batch) < batch_size:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(request_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+
+    return batch
+
+
+def run_inference_server(model_path, request_queue, response_queues, batch_size, batch_timeout_ms, log_queue=None):
+    """Own the pose model and serve batched detections for every camera process"""
+    from logs import setup_logging
+    setup_logging(log_queue, camera="inference")
+
+    from pose_module import load_model, detect_batch
+
+    model = load_model(model_path)
+    attached = {}
+
+    logger.info("Inference server ready (batch %d, %d ms)", batch_size, batch_timeout_ms)
+
+    try:
+        while True:
+            batch = collect_batch(request_queue, batch_size, batch_timeout_ms / 1000.0)
+
+            # cameras may use different imgsz / conf, batch each setting separately
+            groups = {}
+            for camera_key, seq, shm_name, shape, dtype, imgsz, person_conf in batch:
+                if camera_key not in attached or attached[camera_key].name != shm_name:
+                    if camera_key in attached:
+                        attached[camera_key].close()
+                    attached[camera_key] = shared_memory.SharedMemory(name=shm_name)
+                shm = attached[camera_key]
+                # copy out so the camera can reuse its buffer as soon as it gets the answer
+                frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf).copy()
+                groups.setdefault((imgsz, person_conf), []).append((camera_key, seq, frame))
+
+            for (imgsz, person_conf), requests in groups.items():
+                results = detect_batch(model, [f for _, _, f in requests], imgsz, person_conf)
+
+                for (camera_key, seq, _), detections in zip(requests, results):
+                    response_queues[camera_key].put((seq, detections))
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        for shm in attached.values():
+            shm.close()
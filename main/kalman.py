@@ -0,0 +1,110 @@
+import numpy as np
+
+NUM_KPTS = 17
+
+# constant-velocity model per keypoint, state [x, y, vx, vy], measurement [x, y]
+F = np.array([[1, 0, 1, 0],
+              [0, 1, 0, 1],
+              [0, 0, 1, 0],
+              [0, 0, 0, 1]], dtype=float)
+H = np.array([[1, 0, 0, 0],
+              [0, 1, 0, 0]], dtype=float)
+R = np.eye(2) * 0.1
+Q = np.eye(4) * 0.01
+P0 = np.eye(4) * 10
+I4 = np.eye(4)
+
+
+class KeypointSmoother:
+    """
+    Batched constant-velocity Kalman filter for the keypoints of all tracks
+
+    Same model and numbers as the former per-keypoint filterpy filters
+    (P=10, R=0.1, Q=0.01, Joseph form update), but the states of every
+    keypoint of every track live in stacked arrays and one call predicts or
+    updates a whole frame.
+    """
+
+    def __init__(self, capacity=16):
+        self.x = np.zeros((capacity, NUM_KPTS, 4))
+        self.P = np.zeros((capacity, NUM_KPTS, 4, 4))
+        self.slots = {}     # track id -> row
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def __contains__(self, track_id):
+        return track_id in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        capacity = len(self.x)
+        self.x = np.concatenate([self.x, np.zeros_like(self.x)])
+        self.P = np.concatenate([self.P, np.zeros_like(self.P)])
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(self, track_id, kpts):
+        """Start a track at its first measured keypoints (17, 2), velocity 0"""
+        if not self.free:
+            self._grow()
+        row = self.free.pop()
+        self.slots[track_id] = row
+        self.x[row] = 0
+        self.x[row, :, :2] = kpts
+        self.P[row] = P0
+
+    def remove(self, track_id):
+        row = self.slots.pop(track_id, None)
+        if row is not None:
+            self.free.append(row)
+
+    def rows(self, track_ids):
+        return np.fromiter((self.slots[t] for t in track_ids), dtype=int, count=len(track_ids))
+
+    def predict(self, track_ids):
+        """Predict one step for the given tracks, returns their positions (n, 17, 2)"""
+        rows = self.rows(track_ids)
+        if len(rows) == 0:
+            return np.zeros((0, NUM_KPTS, 2))
+
+        x = self.x[rows] @ F.T
+        P = F @ self.P[rows] @ F.T + Q
+
+        self.x[rows] = x
+        self.P[rows] = P
+        return x[..., :2].copy()
+
+    def step(self, track_ids, kpts, visible):
+        """
+        Predict, then update the visible keypoints of the given tracks
+
+        kpts (n, 17, 2) measurements, visible (n, 17) bool mask; hidden
+        keypoints only get the prediction. Returns the positions (n, 17, 2).
+        """
+        rows = self.rows(track_ids)
+        if len(rows) == 0:
+            return np.zeros((0, NUM_KPTS, 2))
+
+        x = self.x[rows] @ F.T
+        P = F @ self.P[rows] @ F.T + Q
+
+        visible = np.asarray(visible, dtype=bool)
+        if visible.any():
+            xv, Pv = x[visible], P[visible]                 # (k, 4), (k, 4, 4)
+            z = np.asarray(kpts, dtype=float)[visible]      # (k, 2)
+
+            y = z - xv[:, :2]
+            PHT = Pv[:, :, :2]                              # P H^T
+            S = Pv[:, :2, :2] + R                           # H P H^T + R
+            K = PHT @ np.linalg.inv(S)                      # (k, 4, 2)
+
+            xv = xv + (K @ y[..., None])[..., 0]
+            I_KH = I4 - K @ H
+            Pv = I_KH @ Pv @ I_KH.transpose(0, 2, 1) + K @ R @ K.transpose(0, 2, 1)
+
+            x[visible] = xv
+            P[visible] = Pv
+
+        self.x[rows] = x
+        self.P[rows] = P
+        return x[..., :2].copy()
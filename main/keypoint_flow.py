@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+
+
+class KeypointFlow:
+    """
+    Carry keypoints forward between pose keyframes with sparse LK optical flow
+
+    On a keyframe the measured keypoints of the tracked people are stored;
+    on the frames in between they are moved with pyramidal Lucas-Kanade on
+    a downscaled grayscale frame. Each point is checked forward-backward,
+    points that fail stay lost until the next keyframe. propagate() returns
+    None (= run the model now) when too few points survive.
+    """
+
+    def __init__(self, width=320, win_size=21, max_level=2, max_fb_error=1.5, min_tracked_ratio=0.5):
+        self.width = width
+        self.lk_params = dict(
+            winSize=(win_size, win_size),
+            maxLevel=max_level,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        )
+        self.max_fb_error = max_fb_error
+        self.min_tracked_ratio = min_tracked_ratio
+
+        self.scale = 1.0
+        self.prev_gray = None
+        self.pts = np.zeros((0, 17, 2), dtype=np.float32)    # downscaled coordinates
+        self.valid = np.zeros((0, 17), dtype=bool)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.keyframe_points = 0
+
+        # counters
+        self.propagated = 0
+        self.drifted = 0
+
+    def gray(self, frame):
+        h, w = frame.shape[:2]
+        self.scale = min(1.0, self.width / w)
+        if self.scale < 1.0:
+            frame = cv2.resize(frame, (self.width, max(1, int(h * self.scale))), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def keyframe(self, frame, kpts, visible, boxes):
+        """Start from the measured keypoints (P, 17, 2) of a keyframe"""
+        self.prev_gray = self.gray(frame)
+        self.pts = np.asarray(kpts, dtype=np.float32) * self.scale
+        self.valid = np.asarray(visible, dtype=bool).copy()
+        self.boxes = np.asarray(boxes, dtype=np.float32).copy()
+        self.keyframe_points = int(self.valid.sum())
+
+    def propagate(self, frame):
+        """
+        Move the keypoints to this frame
+
+        Returns (kpts (P, 17, 2), valid (P, 17), boxes (P, 4)) in full-frame
+        coordinates, or None when the flow drifted and a keyframe is needed.
+        """
+        if self.prev_gray is None:
+            return None
+
+        gray = self.gray(frame)
+        if gray.shape != self.prev_gray.shape:
+            return None
+
+        if self.keyframe_points == 0:
+            self.prev_gray = gray
+            return self.pts / self.scale, self.valid, self.boxes
+
+        prev_pts = self.pts[self.valid].reshape(-1, 1, 2)
+        next_pts, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, prev_pts, None, **self.lk_params)
+        back_pts, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, next_pts, None, **self.lk_params)
+
+        # forward-backward check: a point has to come back to where it started
+        fb_error = np.linalg.norm(back_pts - prev_pts, axis=2).reshape(-1)
+        good = (status.reshape(-1) == 1) & (back_status.reshape(-1) == 1) & (fb_error < self.max_fb_error)
+
+        if good.sum() < self.min_tracked_ratio * self.keyframe_points:
+            self.drifted += 1
+            return None
+
+        # boxes follow the median motion of the good points of each person
+        moved = np.zeros_like(self.pts)
+        moved[self.valid] = next_pts.reshape(-1, 2) - prev_pts.reshape(-1, 2)
+        valid = self.valid.copy()
+        valid[self.valid] = good
+
+        for i in range(len(valid)):
+            if valid[i].any():
+                dx, dy = np.median(moved[i][valid[i]], axis=0) / self.scale
+                self.boxes[i] += (dx, dy, dx, dy)
+
+        self.pts[valid] += moved[valid]
+        self.valid = valid
+        self.prev_gray = gray
+        self.propagated += 1
+
+        return self.pts / self.scale, valid, self.boxes.copy()
+
+    def stats(self):
+        total = self.propagated + self.drifted
+        return {
+            "propagated": self.propagated,
+            "drifted": self.drifted,
+            "drift_ratio": self.drifted / total if total else 0.0
+        }
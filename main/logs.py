@@ -0,0 +1,167 @@
+"""
+Leveled, rate-limited logging shared by all processes
+
+The main process owns the only stream handler: start_logging() runs a
+QueueListener on a multiprocessing queue, and every camera / inference
+process calls setup_logging(queue) so its records only cost a put_nowait
+on that queue. Nothing on the frame loop writes to stdout itself.
+
+    logger = logging.getLogger(__name__)
+    logger.info("Stream ended")
+    logger.warning("Track lost", extra={"track": track_id})
+
+Records below ERROR are rate limited per (logger, camera, track, message
+template); pass extra={"rate_limit": False} for periodic reports that
+must not be merged. Per-frame detail goes into a TraceRing and is only
+logged when an alert fires.
+"""
+import logging
+import logging.handlers
+import multiprocessing as mp
+import os
+import sys
+import time
+from collections import deque
+from app_config import load_config
+
+config = load_config()
+
+log_level = config["logging"]["level"]
+rate_limit_seconds = config["logging"]["rate_limit_seconds"]
+trace_size = config["logging"]["trace_size"]
+quiet_ultralytics = config["logging"]["quiet_ultralytics"]
+
+FORMAT = "%(asctime)s %(levelname)-7s [%(camera)s] %(name)s: %(message)s"
+
+
+class CameraFilter(logging.Filter):
+    """Tag records with the camera of this process unless they name one"""
+
+    def __init__(self, camera="-"):
+        super().__init__()
+        self.camera = camera
+
+    def filter(self, record):
+        if not hasattr(record, "camera"):
+            record.camera = self.camera
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let a message through at most once per interval
+
+    The key is the logger, camera, track and the unformatted message, so
+    the same warning for two tracks is not merged. The next record that
+    passes reports how many were dropped in between.
+    """
+
+    def __init__(self, interval):
+        super().__init__()
+        self.interval = interval
+        self.last = {}          # key -> time of the last record let through
+        self.suppressed = {}    # key -> records dropped since
+
+    def filter(self, record):
+        if self.interval <= 0 or record.levelno >= logging.ERROR:
+            return True
+        if not getattr(record, "rate_limit", True):
+            return True
+
+        key = (record.name, getattr(record, "camera", None), getattr(record, "track", None), record.msg)
+        last = self.last.get(key)
+        if last is not None and record.created - last < self.interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return False
+
+        self.last[key] = record.created
+        dropped = self.suppressed.pop(key, 0)
+        if dropped:
+            record.msg = f"{record.msg} ({dropped} similar suppressed)"
+
+        # tracks come and go, forget keys that are long quiet
+        if len(self.last) > 10000:
+            cutoff = record.created - self.interval
+            self.last = {k: t for k, t in self.last.items() if t >= cutoff}
+            self.suppressed = {k: n for k, n in self.suppressed.items() if k in self.last}
+
+        return True
+
+
+class TraceRing:
+    """
+    Verbose per-frame traces kept in memory
+
+    add() only stores the message template and its arguments, formatting
+    happens in dump(), which logs the entries of a track as one record.
+    """
+
+    def __init__(self, size=None):
+        self.entries = deque(maxlen=trace_size if size is None else size)
+
+    def add(self, track_id, msg, *args):
+        self.entries.append((time.time(), track_id, msg, args))
+
+    def dump(self, logger, track_id=None, level=logging.INFO, camera=None):
+        lines = [
+            time.strftime("%H:%M:%S", time.localtime(created)) + f" track {tid}: " + (msg % args)
+            for created, tid, msg, args in self.entries
+            if track_id is None or tid == track_id
+        ]
+        if not lines:
+            return
+
+        extra = {"track": track_id, "rate_limit": False}
+        if camera is not None:
+            extra["camera"] = camera
+        logger.log(level, "Trace of the last %d entries:\n  %s", len(lines), "\n  ".join(lines), extra=extra)
+
+
+def configure(handler, level=None, camera="-"):
+    """Make handler the only handler of the root logger"""
+    handler.addFilter(CameraFilter(camera))
+    handler.addFilter(RateLimitFilter(rate_limit_seconds))
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level or log_level)
+
+    if quiet_ultralytics:
+        # read by ultralytics on import; predict/track then only log warnings
+        os.environ["YOLO_VERBOSE"] = "False"
+        logging.getLogger("ultralytics").setLevel(logging.WARNING)
+
+
+def setup_logging(queue=None, level=None, camera="-"):
+    """
+    Log through queue (from start_logging) or, without one, straight to stdout
+
+    Call once at the start of every process, again to change the camera tag.
+    """
+    if queue is not None:
+        handler = logging.handlers.QueueHandler(queue)
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter(FORMAT))
+    configure(handler, level, camera)
+
+
+def start_logging(level=None):
+    """
+    Start the single writer in the main process
+
+    Returns (queue, listener): hand queue to the worker processes, call
+    listener.stop() on shutdown to flush what is still queued.
+    """
+    queue = mp.Queue(-1)
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter(FORMAT))
+    stream.addFilter(CameraFilter())
+    listener = logging.handlers.QueueListener(queue, stream)
+    listener.start()
+
+    setup_logging(queue, level, camera="main")
+    return queue, listener
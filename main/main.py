@@ -1,203 +1,506 @@
 import cv2
 from pose_module import PoseEstimator
-from fall_rules import fall_rule_based
+from fall_rules import FallMemory, fall_rule_batch
+from capture import FrameGrabber
+from inference_server import InferenceClient, run_inference_server
+from stride import InferenceStride
+from frame_buffer import CompressedFrameRing, GlobalBudget
+from clip_writer import ClipWriterPool
+from preview import PreviewServer
+from supervisor import CameraSupervisor
+from roi import Roi, parse_roi
+from motion_gate import MotionGate
+from camera_settings import parse_analytics_config, camera_settings
+from startup import StartupTimer
+from metrics import CameraMetrics, MetricsServer
+from overlay import OverlayRenderer
+from logs import setup_logging, start_logging
+import logging
 import time
-import json
+from app_config import ENV_VAR, ConfigService, load_config
 from db import get_active_cameras, insert_fall_alert
 import multiprocessing as mp
+import argparse
+import signal
+import threading
 import uuid
-import base64
-from PIL import Image 
-from io import BytesIO
-from collections import deque
 import os
 
-#load config.json
-with open("/home/asadel/ASADEL PROJECTS/Fall_Detection/main/config.json", "r") as f:
-    config = json.load(f)
+config = load_config()
+logger = logging.getLogger("main")
 
 
 # Paths
 model_path = config["params"]["model_path"]
 default_fps = config["params"]["default_fps"]
+drop_stale_frames = config["params"]["drop_stale_frames"]
+roi_mask_outside = config["params"]["roi_mask_outside"]
+frame_skip = config["params"]["frame_skip"]
+max_frame_skip = config["params"]["max_frame_skip"]
+
+shared_inference = config["inference"]["shared"]
+inference_workers = config["inference"]["workers"]
+batch_size = config["inference"]["batch_size"]
+batch_timeout_ms = config["inference"]["batch_timeout_ms"]
 
 clip_before_seconds = config["alert"]["clip_before_seconds"] 
 clip_after_seconds = config["alert"]["clip_after_seconds"]
+clip_jpeg_quality = config["alert"]["clip_jpeg_quality"]
+buffer_max_fps = config["alert"]["buffer_max_fps"]
+camera_buffer_bytes = int(config["alert"]["camera_buffer_mb"] * 1024 * 1024)
+global_buffer_bytes = int(config["alert"]["global_buffer_mb"] * 1024 * 1024)
+writer_workers = config["alert"]["writer_workers"]
+writer_queue_size = config["alert"]["writer_queue_size"]
+
+snapshot_params = {
+    "quality": config["snapshot"]["quality"],
+    "max_side": config["snapshot"]["max_side"],
+    "thumb_side": config["snapshot"]["thumb_side"],
+    "thumb_quality": config["snapshot"]["thumb_quality"]
+}
+
+headless = config["display"]["headless"]
+preview_enabled = config["display"]["preview"]
+preview_port = config["display"]["preview_port"]
+preview_fps = config["display"]["preview_fps"]
+
+open_timeout_ms = config["supervisor"]["open_timeout_ms"]
+reconnect_backoff_initial = config["supervisor"]["reconnect_backoff_initial"]
+reconnect_backoff_max = config["supervisor"]["reconnect_backoff_max"]
+report_interval = config["supervisor"]["report_interval"]
+shutdown_timeout = config["supervisor"]["shutdown_timeout"]
+
+start_method = config["startup"]["start_method"]
+preload_model = config["startup"]["preload_model"]
+stage_size = config["startup"]["stage_size"]
+stage_delay = config["startup"]["stage_delay"]
+
+metrics_enabled = config["metrics"]["enabled"]
+metrics_port = config["metrics"]["port"]
+metrics_interval = config["metrics"]["interval_seconds"]
+metrics_log_json = config["metrics"]["log_json"]
 
 CLIP_FOLDER ="/home/asadel/ASADEL PROJECTS/Fall_Detection_clip"
 # create folder if it doesn't exist
 os.makedirs(CLIP_FOLDER, exist_ok=True)
 
-#to capture snapshot
-def img_to_data_url(img):
-    # Convert OpenCV (BGR) to RGB
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-
-    # Convert to PIL Image
-    pil_img = Image.fromarray(img_rgb)
-
-    # Save to buffer in JPEG format
-    buffered = BytesIO()
-    pil_img.save(buffered, format="JPEG")
-
-    # Encode to base64
-    img_encoded = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-    # Format as Data URL
-    return f"data:image/jpeg;base64,{img_encoded}"
-
-def run_camera(camera_id, camera_name, rtsp_url, model_path, default_fps):
-    print(f"\n Starting camera {camera_id}:{camera_name}")
+def run_camera(camera_id, camera_name, rtsp_url, model_path, default_fps, inference_queues=None,
+               buffer_used=None, buffer_slot=None, preview_port=None, roi=None, analytics_config=None,
+               launched_at=None, metrics_queue=None, log_queue=None, stop_event=None):
+    setup_logging(log_queue, camera=f"{camera_id}:{camera_name}")
+    logger.info("Starting camera")
+
+    # Ctrl+C reaches the whole process group; main sets stop_event instead
+    # and waits for the clips, so a camera must not die in its finally.
+    # SIGTERM ends the loop the same way.
+    stop_requested = threading.Event()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_requested.set())
+    timer = StartupTimer(f"camera {camera_id}", start=launched_at)
+    # process start + imports (the whole spawn cost when launched_at is given)
+    timer.since_start("process start")
     
 
-    fall_memory = {}
-    pose_estimator = PoseEstimator(model_path) 
-    cap = cv2.VideoCapture(rtsp_url)
-
-    if not cap.isOpened():
-        print(f"Failed to load Rtsp for {camera_id}:{camera_name}")
-        return
+    client = None
+    if inference_queues is not None:
+        request_queue, response_queue = inference_queues
+        client = InferenceClient(camera_id, request_queue, response_queue)
+
+    roi_points = parse_roi(roi)
+    if roi_points is not None:
+        logger.info("ROI with %d points", len(roi_points))
+        roi = Roi(roi_points, mask_outside=roi_mask_outside)
+    else:
+        roi = None
+
+    # config.json + AnalyticsConfig, thresholds are reloaded while running
+    config_service = ConfigService(parse_analytics_config(analytics_config))
+    settings = config_service.settings
+
+    fall_memory = FallMemory(settings=settings["rules"])
+
+    metrics = None
+    if metrics_enabled:
+        metrics = CameraMetrics(camera_id, metrics_queue, metrics_interval, metrics_log_json)
+
+    with timer.phase("model load"):
+        pose_estimator = PoseEstimator(model_path, client=client, roi=roi, settings=settings["inference"],
+                                       metrics=metrics)
+    # rule state goes together with the Kalman state of an expired track
+    pose_estimator.tracks.on_evict(lambda track_id: fall_memory.pop(track_id, None))
+    motion = settings["motion"]
+    gate = None
+    if motion["enabled"]:
+        gate = MotionGate(
+            min_area_ratio=motion["min_area_ratio"],
+            var_threshold=motion["var_threshold"],
+            width=motion["width"],
+            heartbeat_seconds=motion["heartbeat_seconds"]
+        )
+    stride = InferenceStride(frame_skip, max_frame_skip, default_fps)
+    renderer = OverlayRenderer()
+    # opens (and reopens) the stream on its own thread, never blocks startup
+    stream_start = time.time()
+    cap = FrameGrabber(
+        rtsp_url,
+        drop_stale=drop_stale_frames,
+        open_timeout_ms=open_timeout_ms,
+        backoff_initial=reconnect_backoff_initial,
+        backoff_max=reconnect_backoff_max,
+        metrics=metrics
+    )
+    cap.start()
+
+    clip_writer = ClipWriterPool(
+        CLIP_FOLDER,
+        insert_fall_alert,
+        workers=writer_workers,
+        queue_size=writer_queue_size,
+        snapshot_params=snapshot_params,
+        metrics=metrics,
+        renderer=renderer
+    )
 
     fps = 0
     prev_time = time.time()
     frame_counter = 0
    
-    frame_buffer = deque()  # store frames for "before fall"
+    # compressed frames for "before fall"
+    frame_buffer = CompressedFrameRing(
+        clip_before_seconds,
+        buffer_max_fps,
+        camera_buffer_bytes,
+        GlobalBudget(global_buffer_bytes, buffer_used, buffer_slot) if buffer_used is not None else None,
+        clip_jpeg_quality
+    )
+    # the ring has slots for buffer_max_fps, a faster stream gets a shorter pre-roll
+    buffer_fps_warned = False
     recording = False
     record_start_time = None
     clip_frames = []
     before_frames = []
 
     alert_id = None
-    snapshot_64 = None
+
+    preview = None
+    if preview_port is not None:
+        preview = PreviewServer(preview_port, max_fps=preview_fps)
+        logger.info("Preview on http://127.0.0.1:%d/stream.mjpg", preview_port)
+    snapshot_frame = None
+    snapshot_detections = None
+    snapshot_statuses = None
 
     try:
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                print(f"[{camera_id}:{camera_name}] RTSP read failed")
+            if stop_requested.is_set() or (stop_event is not None and stop_event.is_set()):
+                logger.info("Stopping, writing pending clips")
                 break
 
-            now = time.time()
-
-            raw_frame = frame.copy()
-
-            frame_buffer.append((now, raw_frame))
-            while frame_buffer and (now - frame_buffer[0][0] > clip_before_seconds):
-                frame_buffer.popleft()
+            ret, frame, now = cap.read(timeout=1.0)
+            if ret:
+                if timer is not None:
+                    timer.mark("first frame", time.time() - stream_start)
+                    timer.report()
+                    timer = None
+
+                # encode the raw frame into the pre-roll ring
+                encoded_frame = frame_buffer.push(now, frame)
+                frame_counter += 1
+            elif cap.ended:
+                logger.info("Stream ended")
+                break
+            else:
+                # reconnecting: model and track state are kept, and the
+                # stats, metrics and config reload below keep running
+                now = time.time()
 
             # Update FPS
-            frame_counter += 1
             if now - prev_time >= 1.0:
                 fps = frame_counter / (now - prev_time)
                 fps = int(fps)
                 frame_counter = 0
                 prev_time = now
-                print(f"[{camera_id}:{camera_name}] FPS: {fps}")
+                if fps > buffer_max_fps and not buffer_fps_warned:
+                    logger.warning("Stream runs at %d fps, above alert.buffer_max_fps %d: clips keep only "
+                                   "%.1fs of the %.1fs before a fall", fps, buffer_max_fps,
+                                   frame_buffer.capacity / fps, clip_before_seconds)
+                    buffer_fps_warned = True
+                stats = cap.stats()
+                track_stats = pose_estimator.tracks.stats()
+                clip_stats = clip_writer.stats()
+                gate_info = ""
+                if gate is not None:
+                    gate_stats = gate.stats()
+                    gate_info = (f"motion skipped: {gate_stats['skipped']} "
+                                 f"processed: {gate_stats['processed']} ")
+                flow_info = ""
+                if pose_estimator.flow is not None:
+                    flow_stats = pose_estimator.flow.stats()
+                    flow_info = (f"flow propagated: {flow_stats['propagated']} "
+                                 f"drifted: {flow_stats['drifted']} ({flow_stats['drift_ratio']:.1%}) ")
+                logger.info("FPS: %d connected: %s decoded: %d dropped: %d processed: %d reconnects: %d "
+                            "uptime: %.0fs buffer: %.1f MB clip jobs: %d (max %d) done: %d failed: %d blocked: %.1fs "
+                            "tracks live: %d evicted: %d %s%s",
+                            fps, stats["connected"], stats["decoded"], stats["dropped"], stats["processed"],
+                            stats["reconnects"], stats["uptime"], frame_buffer.bytes / (1024 * 1024),
+                            clip_stats["queued"], clip_stats["max_queued"], clip_stats["completed"],
+                            clip_stats["failed"], clip_stats["blocked_seconds"],
+                            track_stats["live"], track_stats["evicted"], gate_info, flow_info,
+                            extra={"rate_limit": False})
+
+            # thresholds changed in config.json, the model and tracks are kept
+            reloaded = config_service.poll(now)
+            if reloaded is not None:
+                pose_estimator.apply_settings(reloaded["inference"])
+                fall_memory.settings = reloaded["rules"]
+                if gate is not None:
+                    gate.min_area_ratio = reloaded["motion"]["min_area_ratio"]
+                    gate.heartbeat_seconds = reloaded["motion"]["heartbeat_seconds"]
+
+            if metrics is not None:
+                metrics.gauge("fps", fps)
+                metrics.gauge("active_tracks", len(pose_estimator.active_ids))
+                track_stats = pose_estimator.tracks.stats()
+                metrics.gauge("live_tracks", track_stats["live"])
+                metrics.gauge("lost_tracks", track_stats["lost"])
+                metrics.gauge("evicted_tracks", track_stats["evicted"])
+                metrics.gauge("fall_memory_tracks", len(fall_memory))
+                if pose_estimator.flow is not None:
+                    flow_stats = pose_estimator.flow.stats()
+                    metrics.gauge("flow_propagated", flow_stats["propagated"])
+                    metrics.gauge("flow_drifted", flow_stats["drifted"])
+                    metrics.gauge("flow_drift_ratio", round(flow_stats["drift_ratio"], 4))
+                stats = cap.stats()
+                metrics.gauge("connected", int(stats["connected"]))
+                metrics.gauge("reconnects", stats["reconnects"])
+                metrics.gauge("frames_behind", stats["behind"])
+                clip_stats = clip_writer.stats()
+                metrics.gauge("clip_queue_depth", clip_stats["queued"])
+                metrics.gauge("clip_max_queued", clip_stats["max_queued"])
+                metrics.gauge("clip_blocked_seconds", clip_stats["blocked_seconds"])
+                metrics.gauge("clip_jobs_submitted", clip_stats["submitted"])
+                metrics.gauge("clip_jobs_completed", clip_stats["completed"])
+                metrics.gauge("clip_jobs_failed", clip_stats["failed"])
+                metrics.gauge("buffer_bytes", frame_buffer.bytes)
+                if frame_buffer.global_budget is not None:
+                    metrics.gauge("global_buffer_bytes", frame_buffer.global_budget.total())
+                if client is not None:
+                    metrics.gauge("inference_queue_depth", client.request_queue.qsize())
+                metrics.maybe_publish(now)
 
-            processed_frame, detections = pose_estimator.process_frame(frame)
+            if not ret:
+                continue
 
-            if recording:
-                clip_frames.append(raw_frame)
+            infer = stride.should_infer()
 
-                if now - record_start_time >= clip_after_seconds:
-                    recording = False
-
-                    # Combine before + after frames
-                    all_frames = before_frames + clip_frames
+            # static scene and nobody tracked -> skip the model
+            if infer and gate is not None:
+                gate_frame = frame if roi is None else roi.crop(frame)
+                infer = gate.check(gate_frame, now, bool(pose_estimator.active_ids))
 
-                    if all_frames:
-                        h, w, _ = all_frames[0].shape
-                        clip_path = os.path.join(CLIP_FOLDER, f"{alert_id}.mp4")
+            # overlays only for a local window or a connected preview client
+            show_preview = preview is not None and preview.wants_frame()
+            render = not headless or show_preview
 
-                        out = cv2.VideoWriter(
-                            clip_path,
-                            cv2.VideoWriter_fourcc(*"mp4v"),
-                            fps if fps > 0 else default_fps,
-                            (w, h)
-                        )
+            infer_start = time.time()
+            detections = pose_estimator.process_frame(frame, infer=infer)
+            # the model also runs on skipped frames when the keypoint flow drifted
+            infer = pose_estimator.keyframe
+            infer_time = time.time() - infer_start if infer else None
 
-                        for f in all_frames:
-                            out.write(f)
-                        out.release()
+            if recording:
+                if encoded_frame is not None:
+                    clip_frames.append(encoded_frame)
 
-                    else:
-                        clip_path = None
-                        print(f"[WARN] No frames for clip {alert_id}")
+                if now - record_start_time >= clip_after_seconds:
+                    recording = False
 
-                    insert_fall_alert(
+                    # hand the encoded before + after frames to the writer pool
+                    clip_writer.submit(
                         alert_id=alert_id,
                         camera_id=camera_id,
-                        snapshot_64=snapshot_64,
-                        clip_path=clip_path
+                        snapshot_frame=snapshot_frame,
+                        frames=before_frames + clip_frames,
+                        fps=fps if fps > 0 else default_fps,
+                        detections=snapshot_detections,
+                        statuses=snapshot_statuses
                     )
 
-                    clip_frames.clear()
-                    before_frames.clear()
+                    clip_frames = []
+                    before_frames = []
 
             # ---------------------------------
             # Fall detection
             # ---------------------------------
-            for person_id, kpts, bbox in detections:
-                status, alert_triggered = fall_rule_based(
-                    person_id,
-                    kpts,
-                    bbox,
-                    fps=fps if fps > 0 else default_fps,
-                    fall_memory=fall_memory,
-                    camera_id=camera_id,
-                    camera_name=camera_name
-                )
-
+            # rules run on every frame (inferred or predicted), so the
+            # frame-count based velocities stay valid at the processed fps
+            rules_start = time.perf_counter()
+            results = fall_rule_batch(
+                detections.ids,
+                detections.kpts,
+                detections.boxes,
+                fps=fps if fps > 0 else default_fps,
+                fall_memory=fall_memory,
+                camera_id=camera_id,
+                camera_name=camera_name
+            )
+            rules_time = time.perf_counter() - rules_start
+            statuses = [status for status, _ in results]
+
+            for _, alert_triggered in results:
                 if alert_triggered and not recording:
                     alert_id = str(uuid.uuid4())
-                    snapshot_64 = img_to_data_url(frame)
+                    # overlay drawn and encoded later on the writer threads
+                    snapshot_frame = frame.copy()
+                    snapshot_detections = detections
+                    snapshot_statuses = statuses
 
-                    before_frames = [f for _, f in frame_buffer]
+                    before_frames = frame_buffer.frames()
 
                     recording = True
                     record_start_time = now
                     clip_frames = []
 
-                # Draw status
-                x1, y1, _, _ = map(int, bbox)
-                color = (0, 255, 0) if status == "NORMAL" else \
-                        (0, 255, 255) if status == "POTENTIAL_FALL" else \
-                        (0, 0, 255)
+                    if metrics is not None:
+                        metrics.count("alerts")
+
+            stride.update(statuses, infer_time)
 
-                cv2.putText(
-                    processed_frame, status,
-                    (x1, y1 - 20),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.6, color, 2
-                )
+            # overlays on a copy, only for frames that are actually shown
+            processed_frame = None
+            if render:
+                draw_start = time.perf_counter()
+                processed_frame = renderer.draw(frame, detections, statuses)
+                draw_time = time.perf_counter() - draw_start
+
+            if metrics is not None:
+                metrics.observe("rules", rules_time)
+                if render:
+                    metrics.observe("draw", draw_time)
+                metrics.count("frames")
+                if infer:
+                    metrics.count("inferences")
 
             # ---------------------------------
             # Display
             # ---------------------------------
-            cv2.imshow(f"Camera {camera_id}", processed_frame)
-            if cv2.waitKey(1) & 0xFF == 27:
-                break
+            if show_preview:
+                preview.publish(processed_frame)
+
+            if not headless:
+                cv2.imshow(f"Camera {camera_id}", processed_frame)
+                if cv2.waitKey(1) & 0xFF == 27:
+                    break
 
     except KeyboardInterrupt:
-        print("\n[INFO] Interrupted by user")
+        logger.info("Interrupted by user")
 
     finally:
         cap.release()
-        cv2.destroyAllWindows()
-        print(f"[INFO] Camera {camera_id} stopped")
+        frame_buffer.clear()
+        if preview is not None:
+            preview.close()
+
+        # keep the alert of a clip that was still recording
+        if recording:
+            clip_writer.submit(
+                alert_id=alert_id,
+                camera_id=camera_id,
+                snapshot_frame=snapshot_frame,
+                frames=before_frames + clip_frames,
+                fps=fps if fps > 0 else default_fps,
+                detections=snapshot_detections,
+                statuses=snapshot_statuses
+            )
+
+        # write out every clip that is already queued
+        clip_writer.shutdown()
+        if client is not None:
+            client.close()
+        if not headless:
+            cv2.destroyAllWindows()
+        logger.info("Camera stopped")
 
 
 def main():
-    cameras = get_active_cameras()
+    # every process logs through this queue, only the main process writes
+    log_queue, log_listener = start_logging()
+    timer = StartupTimer("main")
+
+    with timer.phase("load cameras"):
+        cameras = get_active_cameras()
+
+    # ---------------------------------
+    # Validate per-camera settings
+    # ---------------------------------
+    validate_start = time.time()
+    valid_cameras = []
+    for cam in cameras:
+        try:
+            analytics_config = parse_analytics_config(cam.get("AnalyticsConfig"))
+            settings = camera_settings(config, analytics_config)["inference"]
+            parse_roi(cam.get("Roi"))
+        except ValueError as e:
+            logger.error("Camera skipped, invalid settings: %s", e, extra={"camera": cam["CameraId"]})
+            continue
+
+        logger.info("imgsz=%s person_conf=%s keypoint_conf=%s min_visible_kpts=%s",
+                    settings["imgsz"], settings["person_conf"], settings["keypoint_conf"],
+                    settings["min_visible_kpts"], extra={"camera": cam["CameraId"]})
+        valid_cameras.append(cam)
+    cameras = valid_cameras
+    timer.mark("validate settings", time.time() - validate_start)
 
     if not cameras:
-        print("No active cameras found in DB")
+        logger.warning("No active cameras found in DB")
+        log_listener.stop()
         return
     
-    processes = []
-    
-    for cam in cameras:
+    servers = []
+
+    # ---------------------------------
+    # Metrics endpoint
+    # ---------------------------------
+    metrics_queue = None
+    metrics_server = None
+    if metrics_enabled:
+        metrics_queue = mp.Queue(maxsize=1000)
+        metrics_server = MetricsServer(metrics_port, metrics_queue)
+        logger.info("Metrics on http://127.0.0.1:%d/metrics", metrics_port)
+
+    # ---------------------------------
+    # Shared inference server
+    # ---------------------------------
+    request_queue = None
+    response_queues = {}
+
+    # bytes held by the pre-roll buffer of each camera
+    buffer_used = mp.Array("q", len(cameras))
+
+    if shared_inference:
+        request_queue = mp.Queue()
+        response_queues = {cam["CameraId"]: mp.Queue() for cam in cameras}
+
+        for i in range(inference_workers):
+            p = mp.Process(
+                target=run_inference_server,
+                args=(model_path, request_queue, response_queues, batch_size, batch_timeout_ms, log_queue),
+                daemon=True
+            )
+            p.start()
+            servers.append(p)
+            logger.info("Inference server %d started", i)
+        timer.since_start("inference servers started")
+
+    camera_index = {cam["CameraId"]: index for index, cam in enumerate(cameras)}
+    # set on Ctrl+C, cameras leave their loop and drain their clip writers
+    stop_event = mp.Event()
+
+    def start_camera(cam):
+        inference_queues = None
+        if shared_inference:
+            inference_queues = (request_queue, response_queues[cam["CameraId"]])
+
         p = mp.Process(
             target= run_camera,
             args=(
@@ -205,22 +508,75 @@ def main():
                 cam['CameraName'],
                 cam["RTSPUrl"],
                 model_path,
-                default_fps
+                default_fps,
+                inference_queues,
+                buffer_used,
+                camera_index[cam["CameraId"]],
+                preview_port + camera_index[cam["CameraId"]] if preview_enabled else None,
+                cam.get("Roi"),
+                cam.get("AnalyticsConfig"),
+                time.time(),
+                metrics_queue,
+                log_queue,
+                stop_event
             ),
             daemon=True
         )
         p.start()
-        processes.append(p)
-        print(f"Process started for {cam['CameraId']}")
+        logger.info("Process started", extra={"camera": cam["CameraId"]})
+        return p
+
+    def release_camera(cam):
+        # a killed camera never cleared its pre-roll buffer
+        GlobalBudget(global_buffer_bytes, buffer_used, camera_index[cam["CameraId"]]).release()
+
+    # restarts crashed camera processes with backoff
+    supervisor = CameraSupervisor(
+        start_camera,
+        backoff_initial=reconnect_backoff_initial,
+        backoff_max=reconnect_backoff_max,
+        on_crash=release_camera
+    )
+
+    # ---------------------------------
+    # Start cameras in stages
+    # ---------------------------------
+    # each stage gets time to load and open its streams before the next one,
+    # so disk, CPU and the inference server are not hit by all cameras at once
+    for stage, first in enumerate(range(0, len(cameras), stage_size)):
+        if stage:
+            time.sleep(stage_delay)
+        with timer.phase(f"stage {stage + 1}"):
+            for cam in cameras[first:first + stage_size]:
+                supervisor.add(cam)
+
+    timer.report()
 
     try:
-        for p in processes:
-            p.join()
+        last_report = time.time()
+        while supervisor.poll():
+            time.sleep(1)
+            if time.time() - last_report >= report_interval:
+                supervisor.report()
+                last_report = time.time()
     except KeyboardInterrupt:
-        print("\n[INFO] Terminating all camera process")
-        for p in processes:
+        logger.info("Stopping all camera processes, waiting up to %.0fs for pending clips", shutdown_timeout)
+        supervisor.stop(stop_event, shutdown_timeout)
+    finally:
+        for p in servers:
             p.terminate()
+        if metrics_server is not None:
+            metrics_server.close()
+        log_listener.stop()
 
 if __name__ =="__main__":
-    mp.set_start_method("spawn", force = True)
+    parser = argparse.ArgumentParser()
+    # read by app_config.config_path() before anything else is imported
+    parser.add_argument("--config", help=f"config.json to use, default ${ENV_VAR} or main/config.json")
+    parser.parse_args()
+
+    mp.set_start_method(start_method, force = True)
+    if start_method == "forkserver" and preload_model:
+        # heavy imports + model weights are loaded once in the forkserver
+        mp.set_forkserver_preload(["model_preload"])
     main()
\ No newline at end of file
@@ -0,0 +1,193 @@
+import json
+import logging
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# seconds, tuned for per-frame stages (0.5 ms .. 2.5 s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        # cumulative bucket counts, as Prometheus expects
+        cumulative, total = [], 0
+        for c in self.counts:
+            total += c
+            cumulative.append(total)
+        return {"buckets": list(self.buckets), "counts": cumulative, "count": self.count, "sum": self.sum}
+
+
+class CameraMetrics:
+    """
+    Stage timers, gauges and counters of one camera process
+
+    Every interval seconds publish() logs one JSON line and sends a snapshot
+    to the main process, which serves all cameras on the metrics endpoint.
+    """
+
+    def __init__(self, camera_id, publish_queue=None, interval=10.0, log_json=True):
+        self.camera_id = camera_id
+        self.publish_queue = publish_queue
+        self.interval = interval
+        self.log_json = log_json
+
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.gauges = {}
+        self.counters = {}
+        self.last_publish = time.time()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(seconds)
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "camera": self.camera_id,
+                "time": time.time(),
+                "stages": {stage: h.snapshot() for stage, h in self.histograms.items()},
+                "gauges": dict(self.gauges),
+                "counters": dict(self.counters)
+            }
+
+    def maybe_publish(self, now):
+        if now - self.last_publish < self.interval:
+            return
+        self.last_publish = now
+
+        snap = self.snapshot()
+
+        if self.log_json:
+            summary = {
+                "camera": self.camera_id,
+                "stages_ms": {
+                    stage: round(1000 * h["sum"] / h["count"], 2)
+                    for stage, h in snap["stages"].items() if h["count"]
+                },
+                "gauges": snap["gauges"],
+                "counters": snap["counters"]
+            }
+            logger.info("%s", json.dumps({"metrics": summary}), extra={"rate_limit": False})
+
+        if self.publish_queue is not None:
+            try:
+                self.publish_queue.put_nowait(snap)
+            except queue.Full:
+                pass
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+
+def render_prometheus(snapshots):
+    """Prometheus text exposition of the latest snapshot of every camera"""
+    lines = ["# TYPE fall_stage_seconds histogram"]
+    for snap in snapshots:
+        for stage, h in snap["stages"].items():
+            labels = _labels(camera=snap["camera"], stage=stage)
+            for bound, count in zip(h["buckets"], h["counts"]):
+                lines.append(f'fall_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'fall_stage_seconds_bucket{{{labels},le="+Inf"}} {h["count"]}')
+            lines.append(f"fall_stage_seconds_sum{{{labels}}} {h['sum']}")
+            lines.append(f"fall_stage_seconds_count{{{labels}}} {h['count']}")
+
+    gauge_names = sorted({name for snap in snapshots for name in snap["gauges"]})
+    for name in gauge_names:
+        lines.append(f"# TYPE fall_{name} gauge")
+        for snap in snapshots:
+            if name in snap["gauges"]:
+                lines.append(f"fall_{name}{{{_labels(camera=snap['camera'])}}} {snap['gauges'][name]}")
+
+    counter_names = sorted({name for snap in snapshots for name in snap["counters"]})
+    for name in counter_names:
+        lines.append(f"# TYPE fall_{name}_total counter")
+        for snap in snapshots:
+            if name in snap["counters"]:
+                lines.append(f"fall_{name}_total{{{_labels(camera=snap['camera'])}}} {snap['counters'][name]}")
+
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Collect camera snapshots in the main process and serve them
+
+        GET /metrics       Prometheus text format
+        GET /metrics.json  latest raw snapshots
+    """
+
+    def __init__(self, port, publish_queue, host="127.0.0.1"):
+        self.publish_queue = publish_queue
+        self.latest = {}
+        self.lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    snapshots = list(server.latest.values())
+
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(snapshots).encode()
+                    content_type = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = render_prometheus(snapshots).encode()
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def _collect(self):
+        while True:
+            snap = self.publish_queue.get()
+            with self.lock:
+                self.latest[snap["camera"]] = snap
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
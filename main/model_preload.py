@@ -0,0 +1,18 @@
+"""
+Imported by the forkserver (startup.start_method = "forkserver")
+
+Loads the pose model once in the forkserver, every camera process forked
+from it inherits the loaded weights instead of reading them from disk.
+"""
+import logging
+import time
+from app_config import load_config
+from logs import setup_logging
+
+setup_logging(camera="forkserver")
+
+from pose_module import load_model
+
+_start = time.time()
+load_model(load_config()["params"]["model_path"])
+logging.getLogger(__name__).info("Model preloaded in %.2fs", time.time() - _start)
@@ -0,0 +1,61 @@
+import cv2
+
+
+class MotionGate:
+    """
+    Cheap background-subtraction gate in front of the pose model
+
+    Runs MOG2 on a small grayscale copy of the frame. Inference is allowed
+    when there is motion or people are being tracked; otherwise only one
+    heartbeat inference every heartbeat_seconds goes through.
+    """
+
+    def __init__(self, min_area_ratio=0.002, var_threshold=25, width=320,
+                 heartbeat_seconds=2.0, history=500):
+        self.min_area_ratio = min_area_ratio
+        self.width = width
+        self.heartbeat_seconds = heartbeat_seconds
+
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(
+            history=history,
+            varThreshold=var_threshold,
+            detectShadows=True
+        )
+
+        self.last_inference = 0.0
+        self.motion_ratio = 0.0
+        self.skipped = 0
+        self.processed = 0
+
+    def has_motion(self, frame):
+        h, w = frame.shape[:2]
+        scale = self.width / w
+        small = cv2.resize(frame, (self.width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        mask = self.subtractor.apply(gray)
+        # MOG2 marks shadows with 127, only count real foreground
+        _, mask = cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)
+
+        self.motion_ratio = cv2.countNonZero(mask) / mask.size
+        return self.motion_ratio >= self.min_area_ratio
+
+    def check(self, frame, now, has_tracks):
+        """Update the background model and decide whether this frame needs inference"""
+        motion = self.has_motion(frame)
+
+        if motion or has_tracks or now - self.last_inference >= self.heartbeat_seconds:
+            self.last_inference = now
+            self.processed += 1
+            return True
+
+        self.skipped += 1
+        return False
+
+    def stats(self):
+        total = self.skipped + self.processed
+        return {
+            "skipped": self.skipped,
+            "processed": self.processed,
+            "skip_ratio": self.skipped / total if total else 0.0
+        }
@@ -0,0 +1,177 @@
+import cv2
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+from inference_server import empty_detections
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def export_onnx(model_path, imgsz, cache_dir, int8=False):
+    """
+    Export the .pt pose model to ONNX once, cached by weights hash and imgsz
+
+    Returns the path of the (optionally INT8 dynamically quantized) model.
+    Camera processes and inference workers start at the same time: one of
+    them exports under an exclusive lock on <key>.lock, the others wait and
+    reuse its file. Files are written in a private temp directory and only
+    published with os.replace once complete, so a reader never sees a
+    half-written model.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    key = f"{stem}-{file_hash(model_path)[:16]}-{imgsz}"
+    fp32_path = os.path.join(cache_dir, f"{key}.onnx")
+    int8_path = os.path.join(cache_dir, f"{key}-int8.onnx")
+    target = int8_path if int8 else fp32_path
+
+    if os.path.exists(target):
+        return target
+
+    with open(os.path.join(cache_dir, f"{key}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            tmp_dir = tempfile.mkdtemp(prefix=f"{key}-", dir=cache_dir)
+            try:
+                if not os.path.exists(fp32_path):
+                    from ultralytics import YOLO
+
+                    logger.info("Exporting %s to ONNX (imgsz %d)", model_path, imgsz)
+                    # ultralytics writes the .onnx next to the weights, use a private copy
+                    local_model = os.path.join(tmp_dir, os.path.basename(model_path))
+                    shutil.copyfile(model_path, local_model)
+                    exported = YOLO(local_model).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+                    os.replace(exported, fp32_path)
+
+                if int8 and not os.path.exists(int8_path):
+                    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+                    logger.info("Quantizing %s to INT8", fp32_path)
+                    quantized = os.path.join(tmp_dir, f"{key}-int8.onnx")
+                    quantize_dynamic(fp32_path, quantized, weight_type=QuantType.QUInt8)
+                    os.replace(quantized, int8_path)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    return target
+
+
+def letterbox(frame, imgsz):
+    """Resize keeping aspect ratio and pad to imgsz x imgsz, like ultralytics"""
+    h, w = frame.shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_x, pad_y = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right,
+                               cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return frame, gain, left, top
+
+
+class OnnxPoseModel:
+    """
+    yolo-pose through onnxruntime on CPU
+
+    One session per imgsz, exported lazily. detect_batch returns the same
+    (xyxy, scores, kpts, kpt_conf) arrays as the ultralytics path.
+    """
+
+    def __init__(self, model_path, cache_dir, int8=False, intra_threads=0, inter_threads=1,
+                 iou=0.7, max_det=300):
+        self.model_path = model_path
+        self.cache_dir = cache_dir
+        self.int8 = int8
+        self.intra_threads = intra_threads
+        self.inter_threads = inter_threads
+        self.iou = iou
+        self.max_det = max_det
+        self.sessions = {}
+
+    def session(self, imgsz):
+        if imgsz not in self.sessions:
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.intra_threads
+            options.inter_op_num_threads = self.inter_threads
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+            path = export_onnx(self.model_path, imgsz, self.cache_dir, self.int8)
+            self.sessions[imgsz] = ort.InferenceSession(
+                path, options, providers=["CPUExecutionProvider"]
+            )
+        return self.sessions[imgsz]
+
+    def detect_batch(self, frames, imgsz, person_conf):
+        session = self.session(imgsz)
+
+        batch = []
+        transforms = []
+        for frame in frames:
+            img, gain, pad_x, pad_y = letterbox(frame, imgsz)
+            batch.append(img)
+            transforms.append((gain, pad_x, pad_y))
+
+        # BGR HWC uint8 -> RGB CHW float32
+        blob = np.stack(batch)[..., ::-1].transpose(0, 3, 1, 2)
+        blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+
+        input_name = session.get_inputs()[0].name
+        preds = session.run(None, {input_name: blob})[0]  # (B, 5 + 17*3, anchors)
+
+        return [
+            self.postprocess(pred.T, *transform, frame.shape, person_conf)
+            for pred, transform, frame in zip(preds, transforms, frames)
+        ]
+
+    def postprocess(self, pred, gain, pad_x, pad_y, shape, person_conf):
+        pred = pred[pred[:, 4] > person_conf]
+        if len(pred) == 0:
+            return empty_detections()
+
+        cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+        scores = pred[:, 4]
+
+        boxes_xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+        keep = cv2.dnn.NMSBoxes(boxes_xywh.tolist(), scores.tolist(), person_conf, self.iou)
+        keep = np.array(keep, dtype=int).reshape(-1)[:self.max_det]
+
+        pred = pred[keep]
+        cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+
+        xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        xyxy = (xyxy - [pad_x, pad_y, pad_x, pad_y]) / gain
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, shape[0])
+
+        kpts = pred[:, 5:].reshape(-1, 17, 3)
+        kpts_xy = (kpts[..., :2] - [pad_x, pad_y]) / gain
+        kpts_conf = kpts[..., 2]
+
+        # ultralytics reports keypoints below 0.5 confidence as (0, 0)
+        kpts_xy[kpts_conf < 0.5] = 0
+
+        return (xyxy.astype(np.float32),
+                pred[:, 4].astype(np.float32),
+                kpts_xy.astype(np.float32),
+                kpts_conf.astype(np.float32))
@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+
+# skeleton connections (COCO format)
+SKELETON = np.array([
+    (0, 1), (0, 2), (1, 3), (2, 4),
+    (5, 6), (5, 7), (7, 9), (6, 8),
+    (8, 10), (11, 12), (5, 11), (6, 12),
+    (11, 13), (13, 15), (12, 14), (14, 16)
+])
+
+STATUS_COLORS = {
+    "NORMAL": (0, 255, 0),
+    "POTENTIAL_FALL": (0, 255, 255)
+}
+FALL_COLOR = (0, 0, 255)
+
+
+class OverlayRenderer:
+    """
+    Draw boxes, skeletons and fall status of a DetectionBatch
+
+    Works on a copy, so the frame used for inference, the pre-roll buffer
+    and snapshots stays untouched. Boxes, keypoints and skeleton edges of
+    all people each go through a single cv2.polylines call; only the text
+    labels are drawn per person. Call it only for frames that are shown.
+    """
+
+    def __init__(self, box_color=(255, 0, 0), kpt_color=(0, 255, 0), limb_color=(0, 0, 255)):
+        self.box_color = box_color
+        self.kpt_color = kpt_color
+        self.limb_color = limb_color
+
+    def draw(self, frame, batch, statuses=None):
+        canvas = frame.copy()
+        if len(batch) == 0:
+            return canvas
+
+        boxes = batch.boxes.astype(np.int32)
+        kpts = batch.kpts.astype(np.int32)
+        visible = batch.visible
+
+        # boxes as closed 4-point polylines
+        x1, y1, x2, y2 = boxes.T
+        corners = np.stack([
+            np.stack([x1, y1], axis=1), np.stack([x2, y1], axis=1),
+            np.stack([x2, y2], axis=1), np.stack([x1, y2], axis=1)
+        ], axis=1)
+        cv2.polylines(canvas, list(corners), True, self.box_color, 2)
+
+        # skeleton edges with both ends visible, one 2-point line each
+        a, b = SKELETON[:, 0], SKELETON[:, 1]
+        edge_visible = visible[:, a] & visible[:, b]                  # (P, E)
+        segments = np.stack([kpts[:, a], kpts[:, b]], axis=2)        # (P, E, 2, 2)
+        segments = segments[edge_visible]
+        if len(segments):
+            cv2.polylines(canvas, list(segments), False, self.limb_color, 2)
+
+        # visible keypoints as zero-length lines, thickness 6 = filled circle of radius 3
+        points = kpts[visible]
+        if len(points):
+            dots = np.repeat(points[:, None, :], 2, axis=1)
+            cv2.polylines(canvas, list(dots), False, self.kpt_color, 6)
+
+        for i, person_id in enumerate(batch.ids.tolist()):
+            x1, y1 = int(boxes[i, 0]), int(boxes[i, 1])
+            cv2.putText(canvas, f"ID: {person_id}", (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+
+            if statuses is not None:
+                status = statuses[i]
+                cv2.putText(canvas, status, (x1, y1 - 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                            STATUS_COLORS.get(status, FALL_COLOR), 2)
+
+        return canvas
@@ -1,127 +1,311 @@
-import cv2
+import os
+import time
 import numpy as np
-from ultralytics import YOLO
-from filterpy.kalman import KalmanFilter
-import json
+import yaml
+from inference_server import empty_detections
+from onnx_backend import OnnxPoseModel
+from kalman import KeypointSmoother
+from track_registry import TrackRegistry
+from detections import DetectionBatch
+from byte_tracker import ByteTracker
+from keypoint_flow import KeypointFlow
+from app_config import load_config
 
 
-with open("/home/asadel/ASADEL PROJECTS/Fall_Detection/main/config.json", "r") as f:
-    config = json.load(f)
+config = load_config()
 
 conf = config["params"]["person_conf_threshold"]
 keypoint_conf = config["params"]["keypoint_conf_threshold"]
 min_visible_kpts = config["params"]["min_visible_keypoints"]
+default_imgsz = config["params"]["imgsz"]
 
+backend = config["inference"]["backend"]
+onnx_cache_dir = config["inference"]["onnx_cache_dir"]
+onnx_int8 = config["inference"]["onnx_int8"]
+onnx_intra_threads = config["inference"]["onnx_intra_threads"]
+onnx_inter_threads = config["inference"]["onnx_inter_threads"]
 
-class PoseEstimator:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
-        self.kalman_filters = {}
-
-        # skeleton connections (COCO format)
-        self.skeleton = [
-            (0, 1), (0, 2), (1, 3), (2, 4),
-            (5, 6), (5, 7), (7, 9), (6, 8),
-            (8, 10), (11, 12), (5, 11), (6, 12),
-            (11, 13), (13, 15), (12, 14), (14, 16)
-        ]
-
-    def create_kf(self, x, y):
-        kf = KalmanFilter(dim_x=4, dim_z=2)
-        kf.x = np.array([x, y, 0, 0], dtype=float)
-        kf.F = np.array([[1, 0, 1, 0],
-                         [0, 1, 0, 1],
-                         [0, 0, 1, 0],
-                         [0, 0, 0, 1]], dtype=float)
-        kf.H = np.array([[1, 0, 0, 0],
-                         [0, 1, 0, 0]], dtype=float)
-        kf.P *= 10
-        kf.R *= 0.1
-        kf.Q *= 0.01
-        return kf
-
-    def process_frame(self, frame):
-        """Run pose estimation with ByteTrack and return results for each person"""
-
-        results = self.model.track(
-            frame,
-            persist=True,
-            tracker='bytetrack.yaml',
-            conf=conf,
-            classes=[0]
+flow_cfg = config["keypoint_flow"]
+
+TRACKER_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bytetrack.yaml")
+
+# models loaded in this process (or inherited from a preloading forkserver)
+_models = {}
+
+
+def load_model(model_path, threads=None):
+    """
+    Load the pose model once per process, ultralytics/torch are only imported here
+
+    threads caps the inference threads when several processes share the
+    cores: torch.set_num_threads, or the onnxruntime intra-op pool unless
+    inference.onnx_intra_threads sets one. None keeps the library default.
+    """
+    if model_path in _models:
+        return _models[model_path]
+
+    if backend == "onnx":
+        model = OnnxPoseModel(
+            model_path,
+            onnx_cache_dir,
+            int8=onnx_int8,
+            intra_threads=onnx_intra_threads or threads or 0,
+            inter_threads=onnx_inter_threads
+        )
+    else:
+        if threads is not None:
+            import torch
+            torch.set_num_threads(threads)
+
+        from ultralytics import YOLO
+        model = YOLO(model_path)
+
+    _models[model_path] = model
+    return model
+
+
+def extract_detections(result):
+    """
+    Pull boxes, scores and keypoints of one ultralytics result into NumPy arrays
+
+    Everything is packed into one (P, 5 + 17*3) tensor on the device first,
+    so there is a single device-to-host copy per frame.
+    """
+    import torch
+
+    boxes = result.boxes
+    keypoints = result.keypoints
+
+    if boxes is None or len(boxes) == 0 or keypoints is None:
+        return empty_detections()
+
+    # boxes.data: xyxy, conf, cls; keypoints.data: x, y, conf (keypoints.xy
+    # and keypoints.conf are views of it)
+    packed = torch.cat(
+        [boxes.data[:, :5], keypoints.data.reshape(len(boxes), -1)],
+        dim=1
+    ).float().cpu().numpy()
+
+    kpts = packed[:, 5:].reshape(-1, 17, 3)
+    return packed[:, :4], packed[:, 4], kpts[..., :2], kpts[..., 2]
+
+
+def detect_batch(model, frames, imgsz=None, person_conf=None):
+    """Stateless batched pose detection, one (xyxy, scores, kpts, kpt_conf) per frame"""
+    if isinstance(model, OnnxPoseModel):
+        return model.detect_batch(
+            frames,
+            imgsz or default_imgsz,
+            conf if person_conf is None else person_conf
         )
 
-        output = []
+    results = model.predict(
+        frames,
+        imgsz=imgsz or default_imgsz,
+        conf=conf if person_conf is None else person_conf,
+        classes=[0],
+        verbose=False
+    )
+    return [extract_detections(r) for r in results]
+
+
+def load_tracker_config():
+    with open(TRACKER_CONFIG, "r") as f:
+        return yaml.safe_load(f)
+
+
+class PoseEstimator:
+    def __init__(self, model_path, client=None, roi=None, settings=None, metrics=None, threads=None):
+        # with a client, detection runs in the shared inference server
+        self.client = client
+        # optional metrics.CameraMetrics for per-stage timings
+        self.metrics = metrics
+        # optional Roi: inference only sees the cropped region
+        self.roi = roi
+
+        # per-camera inference settings, see camera_settings.inference_settings
+        settings = settings or {}
+        self.imgsz = settings.get("imgsz", default_imgsz)
+        self.person_conf = settings.get("person_conf", conf)
+        self.keypoint_conf = settings.get("keypoint_conf", keypoint_conf)
+        self.min_visible_kpts = settings.get("min_visible_kpts", min_visible_kpts)
+        # threads: inference threads of a local model, see load_model
+        self.model = load_model(model_path, threads) if client is None else None
+        tracker_cfg = load_tracker_config()
+        # per-camera tracker state, detection itself stays stateless
+        self.tracker = ByteTracker(tracker_cfg)
+        # keypoint Kalman state of every track, predicted/updated per frame
+        self.smoother = KeypointSmoother()
+        # people of the last inference frame, carried forward on skipped
+        # frames with their box velocity; age = frames since that inference
+        self.last = DetectionBatch.empty()
+        self.box_vel = np.zeros((0, 4), dtype=np.float32)
+        self.age = 1
+        self.active_ids = set()
+        # True when the model ran on the last processed frame
+        self.keyframe = False
+
+        # between keyframes, move the keypoints with optical flow instead of
+        # extrapolating them
+        self.flow = None
+        if flow_cfg["enabled"]:
+            self.flow = KeypointFlow(
+                width=flow_cfg["width"],
+                win_size=flow_cfg["win_size"],
+                max_level=flow_cfg["max_level"],
+                max_fb_error=flow_cfg["max_fb_error"],
+                min_tracked_ratio=flow_cfg["min_tracked_ratio"]
+            )
+
+        # drops the per-track state once ByteTrack has given up on an id,
+        # run_camera registers fall_memory here as well
+        self.tracks = TrackRegistry(tracker_cfg["track_buffer"])
+        self.tracks.on_evict(self.forget)
+
+    def apply_settings(self, settings):
+        """Thresholds from a config reload, the model and the track state are kept"""
+        self.person_conf = settings.get("person_conf", self.person_conf)
+        self.keypoint_conf = settings.get("keypoint_conf", self.keypoint_conf)
+        self.min_visible_kpts = settings.get("min_visible_kpts", self.min_visible_kpts)
+
+    def forget(self, track_id):
+        self.smoother.remove(track_id)
+
+    def observe(self, stage, seconds):
+        if self.metrics is not None:
+            self.metrics.observe(stage, seconds)
+
+    def detect(self, frame):
+        image = frame if self.roi is None else self.roi.crop(frame)
+
+        if self.client is not None:
+            detections = self.client.infer(image, self.imgsz, self.person_conf)
+        else:
+            detections = detect_batch(self.model, [image], self.imgsz, self.person_conf)[0]
+
+        # back to full-frame coordinates before tracking and the rules
+        return detections if self.roi is None else self.roi.to_frame(detections)
+
+    def detect_frames(self, frames):
+        """Batched detect() over consecutive frames (file mode), local model only"""
+        images = frames if self.roi is None else [self.roi.crop(f) for f in frames]
+        detections = detect_batch(self.model, images, self.imgsz, self.person_conf)
+        if self.roi is not None:
+            detections = [self.roi.to_frame(d) for d in detections]
+        return detections
+
+    def track(self, detections):
+        """Assign ByteTrack ids, returns the tracked people as a DetectionBatch"""
+        xyxy, scores, kpts_xy, kpts_conf = detections
+
+        tracks = self.tracker.update(xyxy, scores)
+
+        if len(tracks) == 0:
+            return DetectionBatch.empty()
+
+        idx = tracks[:, 6].astype(int)
+        return DetectionBatch(tracks[:, 4].astype(int), tracks[:, :4], kpts_xy[idx], kpts_conf[idx])
+
+    def process_frame(self, frame, infer=True, detections=None):
+        """Run pose estimation with ByteTrack, returns a DetectionBatch of the tracked people
+
+        With infer=False the model is skipped and the people seen on the last
+        inference frame are carried forward: by optical flow when keypoint_flow
+        is enabled, otherwise by their Kalman filters. If the flow drifted the
+        model runs anyway (check self.keyframe).
+        detections from detect_frames() skip the per-frame model call.
+        The frame is never modified, drawing is up to overlay.OverlayRenderer.
+        """
+
+        if not infer:
+            batch = self.predict_frame() if self.flow is None else self.flow_frame(frame)
+            if batch is not None:
+                self.keyframe = False
+                return batch
+
+        if detections is None:
+            start = time.perf_counter()
+            detections = self.detect(frame)
+            self.observe("inference", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batch = self.track(detections)
+        self.observe("tracking", time.perf_counter() - start)
 
-        for r in results:
-            boxes = r.boxes
-            kpts_xy = r.keypoints.xy
-            kpts_conf = r.keypoints.conf
+        self.tracks.update(batch.ids.tolist())
 
-            if boxes.id is None:
-                continue
+        # -------------------------------
+        # Filter by confidence
+        # -------------------------------
+        visible = batch.conf > self.keypoint_conf
+        reliable = visible.sum(axis=1) >= self.min_visible_kpts  # skip unreliable poses
+        batch = batch.select(reliable)
+        batch.visible = visible[reliable]
+        ids = batch.ids.tolist()
 
-            for box, kpts, confs in zip(boxes, kpts_xy, kpts_conf):
-                bbox = box.xyxy[0].cpu().numpy()
-                kpts_array = kpts.cpu().numpy()
-                conf_array = confs.cpu().numpy()
+        if self.flow is not None:
+            start = time.perf_counter()
+            self.flow.keyframe(frame, batch.kpts, batch.visible, batch.boxes)
+            self.observe("flow", time.perf_counter() - start)
 
-                person_id = int(box.id.cpu().numpy()[0])
+        # -------------------------------
+        # Kalman predict + update of all people at once (NO RESET)
+        # -------------------------------
+        start = time.perf_counter()
+        for i, person_id in enumerate(ids):
+            if person_id not in self.smoother:
+                self.smoother.add(person_id, batch.kpts[i])
+        batch.kpts = self.smoother.step(ids, batch.kpts, batch.visible)
+        self.observe("kalman", time.perf_counter() - start)
 
-                # -------------------------------
-                # Filter by confidence
-                # -------------------------------
-                visible_mask = conf_array > keypoint_conf
-                visible_count = np.sum(visible_mask)
+        # box motion since the last inference, for the predicted frames
+        last_index = {person_id: i for i, person_id in enumerate(self.last.ids.tolist())}
+        prev = np.array([last_index.get(person_id, -1) for person_id in ids], dtype=int)
+        seen = prev >= 0
+        self.box_vel = np.zeros((len(ids), 4), dtype=np.float32)
+        self.box_vel[seen] = (batch.boxes[seen] - self.last.boxes[prev[seen]]) / self.age
 
-                if visible_count < min_visible_kpts:
-                    continue  # skip unreliable pose
+        self.last = batch
+        self.age = 1
+        self.active_ids = set(ids)
+        self.keyframe = True
 
-                # -------------------------------
-                # Init Kalman (once per ID)
-                # -------------------------------
-                if person_id not in self.kalman_filters:
-                    self.kalman_filters[person_id] = [
-                        self.create_kf(x, y) for x, y in kpts_array
-                    ]
+        return batch
 
-                # -------------------------------
-                # Kalman update (NO RESET)
-                # -------------------------------
-                smooth_kpts = []
+    def predict_frame(self):
+        """Predict keypoints and boxes of the active people without running the model"""
+        last = self.last
 
-                for i, (kf, (x, y)) in enumerate(
-                    zip(self.kalman_filters[person_id], kpts_array)
-                ):
-                    kf.predict()
+        start = time.perf_counter()
+        kpts = self.smoother.predict(last.ids.tolist())
+        self.observe("kalman", time.perf_counter() - start)
 
-                    if visible_mask[i]:
-                        kf.update([x, y])
+        boxes = last.boxes + self.box_vel * self.age
+        self.age += 1
 
-                    smooth_kpts.append((kf.x[0], kf.x[1]))
+        return DetectionBatch(last.ids, boxes, kpts, last.conf, last.visible)
 
-                # -------------------------------
-                # Drawing
-                # -------------------------------
-                x1, y1, x2, y2 = map(int, bbox)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-                cv2.putText(frame, f"ID: {person_id}", (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+    def flow_frame(self, frame):
+        """
+        Move the keypoints of the active people with optical flow
 
-                for i, (sx, sy) in enumerate(smooth_kpts):
-                    if visible_mask[i]:   # draw ONLY high-confidence keypoints
-                        cv2.circle(frame, (int(sx), int(sy)), 3, (0, 255, 0), -1)
+        The flowed points go through the Kalman update like measured ones, so
+        the rules get the same smoothed stream as on inference frames. Returns
+        None when the flow drifted and a keyframe is needed.
+        """
+        last = self.last
 
+        start = time.perf_counter()
+        flowed = self.flow.propagate(frame)
+        self.observe("flow", time.perf_counter() - start)
+        if flowed is None:
+            return None
+        kpts, valid, boxes = flowed
 
-                for i, j in self.skeleton:
-                    if visible_mask[i] and visible_mask[j]:
-                        x1_s, y1_s = smooth_kpts[i]
-                        x2_s, y2_s = smooth_kpts[j]
-                        cv2.line(frame,
-                                (int(x1_s), int(y1_s)),
-                                (int(x2_s), int(y2_s)),
-                                (0, 0, 255), 2)
+        start = time.perf_counter()
+        kpts = self.smoother.step(last.ids.tolist(), kpts, valid & last.visible)
+        self.observe("kalman", time.perf_counter() - start)
 
-                output.append((person_id, smooth_kpts, bbox))
+        self.age += 1
 
-        return frame, output
+        return DetectionBatch(last.ids, boxes, kpts, last.conf, last.visible)
@@ -0,0 +1,151 @@
+import cv2
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class PreviewServer:
+    """
+    Local MJPEG / snapshot endpoint for one camera
+
+        GET /stream.mjpg   live overlay stream at up to max_fps
+        GET /snapshot.jpg  single overlay frame
+
+    The camera loop asks wants_frame() and only renders overlays while a
+    client is connected, so with nobody watching the preview costs nothing.
+    """
+
+    def __init__(self, port, max_fps=5, quality=70, host="127.0.0.1"):
+        self.interval = 1.0 / max_fps
+        self.quality = quality
+
+        self.cond = threading.Condition()
+        self.clients = 0
+        self.snapshot_waiting = 0
+        self.frame = None
+        self.frame_seq = 0
+        self.jpeg = None
+        self.jpeg_seq = 0
+        # frame a client is encoding right now, the others wait for its result
+        self.encoding_seq = 0
+        self.last_publish = 0.0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/stream.mjpg"):
+                    server.serve_stream(self)
+                elif self.path.startswith("/snapshot.jpg"):
+                    server.serve_snapshot(self)
+                else:
+                    self.send_error(404)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    # ---------------------------------
+    # Camera side
+    # ---------------------------------
+    def wants_frame(self):
+        """True when a client is waiting and the preview frame rate allows a new frame"""
+        if not self.clients and not self.snapshot_waiting:
+            return False
+        return time.time() - self.last_publish >= self.interval or self.snapshot_waiting > 0
+
+    def publish(self, frame):
+        with self.cond:
+            self.frame = frame
+            self.frame_seq += 1
+            self.last_publish = time.time()
+            self.cond.notify_all()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    # ---------------------------------
+    # HTTP side
+    # ---------------------------------
+    def next_jpeg(self, after_seq, timeout):
+        """
+        Wait for a frame newer than after_seq, encoded once and shared by all clients
+
+        The encode runs outside the lock, so publish() never waits for it.
+        Published frames are fresh overlay copies that are not modified later.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.frame_seq > after_seq, timeout):
+                return None, after_seq
+
+            frame, seq = self.frame, self.frame_seq
+            if self.encoding_seq == seq:
+                self.cond.wait_for(lambda: self.jpeg_seq >= seq, timeout)
+            if self.jpeg_seq >= seq:
+                return self.jpeg, self.jpeg_seq
+            self.encoding_seq = seq
+
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        jpeg = buf.tobytes() if ok else None
+
+        with self.cond:
+            if seq > self.jpeg_seq:
+                self.jpeg = jpeg
+                self.jpeg_seq = seq
+            self.cond.notify_all()
+
+        return jpeg, seq
+
+    def serve_snapshot(self, handler):
+        with self.cond:
+            self.snapshot_waiting += 1
+            seq = self.frame_seq
+        try:
+            jpeg, _ = self.next_jpeg(seq, timeout=2.0)
+        finally:
+            with self.cond:
+                self.snapshot_waiting -= 1
+
+        if jpeg is None:
+            handler.send_error(503, "No frame available")
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "image/jpeg")
+        handler.send_header("Content-Length", str(len(jpeg)))
+        handler.end_headers()
+        handler.wfile.write(jpeg)
+
+    def serve_stream(self, handler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+
+        with self.cond:
+            self.clients += 1
+            seq = self.frame_seq
+
+        try:
+            while True:
+                jpeg, seq = self.next_jpeg(seq, timeout=5.0)
+                if jpeg is None:
+                    continue
+
+                handler.wfile.write(b"--frame\r\n")
+                handler.wfile.write(b"Content-Type: image/jpeg\r\n")
+                handler.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                handler.wfile.write(jpeg)
+                handler.wfile.write(b"\r\n")
+
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+        finally:
+            with self.cond:
+                self.clients -= 1
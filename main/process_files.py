@@ -0,0 +1,276 @@
+"""
+Batch processing of archived video files for incident review
+
+Each file is decoded on its own thread, pose inference runs batched over
+consecutive frames and tracking, Kalman smoothing and the fall rules run
+as in run_camera. Fall events are written as JSONL (one file per video),
+clips are optional. Files are spread over a pool of worker processes.
+
+    python process_files.py recordings/*.mp4 --out events --workers 4
+    python process_files.py cam3.mp4 --out events --clips --frame-skip 2
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import uuid
+
+import cv2
+
+from pose_module import PoseEstimator
+from fall_rules import FallMemory, fall_rule_batch
+from frame_buffer import CompressedFrameRing
+from clip_writer import ClipWriterPool
+from overlay import OverlayRenderer
+from logs import setup_logging
+from app_config import ENV_VAR, load_config
+
+config = load_config()
+logger = logging.getLogger(__name__)
+
+clip_before_seconds = config["alert"]["clip_before_seconds"]
+clip_after_seconds = config["alert"]["clip_after_seconds"]
+clip_jpeg_quality = config["alert"]["clip_jpeg_quality"]
+camera_buffer_bytes = int(config["alert"]["camera_buffer_mb"] * 1024 * 1024)
+batch_size = config["inference"]["batch_size"]
+
+
+def decode_chunks(path, chunk_size, max_chunks=4):
+    """
+    Decode a file on a background thread
+
+    Yields (fps, [(index, frame), ...]) chunks of consecutive frames; at most
+    max_chunks are decoded ahead of the consumer.
+    """
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or config["params"]["default_fps"]
+    chunks = queue.Queue(maxsize=max_chunks)
+    stop = threading.Event()
+
+    def put(item):
+        # give up once the consumer stopped, so the reader never blocks forever
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def reader():
+        index = 0
+        chunk = []
+        while not stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            chunk.append((index, frame))
+            index += 1
+            if len(chunk) == chunk_size:
+                put(chunk)
+                chunk = []
+        if chunk:
+            put(chunk)
+        put(None)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield fps, chunk
+    finally:
+        stop.set()
+        thread.join()
+        cap.release()
+
+
+def no_persist(**alert):
+    """File mode keeps alerts in the JSONL output, nothing goes to the DB"""
+
+
+def process_file(job):
+    path, out_dir, model_path, frame_skip, batch, clips, verbose, threads = job
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    events_path = os.path.join(out_dir, f"{name}.jsonl")
+
+    setup_logging(camera=name)
+    # fall confirmations and their rule traces, the events are in the JSONL anyway
+    logging.getLogger("fall_rules").setLevel(logging.INFO if verbose else logging.ERROR)
+
+    pose_estimator = PoseEstimator(model_path, threads=threads)
+    fall_memory = FallMemory()
+    pose_estimator.tracks.on_evict(lambda track_id: fall_memory.pop(track_id, None))
+
+    clip_writer = None
+    frame_buffer = None
+    if clips:
+        clip_folder = os.path.join(out_dir, "clips")
+        os.makedirs(clip_folder, exist_ok=True)
+        clip_writer = ClipWriterPool(clip_folder, no_persist, workers=1, renderer=OverlayRenderer())
+
+    recording = False
+    record_start_time = None
+    clip_frames = []
+    before_frames = []
+    snapshot_frame = None
+    snapshot_people = None
+    snapshot_statuses = None
+    clip_id = None  # alert id of the clip being recorded
+
+    frames = 0
+    events = 0
+    fps = None
+    start = time.perf_counter()
+
+    with open(events_path, "w") as events_file:
+        # batch inferred frames per chunk, the skipped ones in between are predicted
+        for fps, chunk in decode_chunks(path, batch * frame_skip):
+            if clips and frame_buffer is None:
+                frame_buffer = CompressedFrameRing(
+                    clip_before_seconds, fps, camera_buffer_bytes, quality=clip_jpeg_quality
+                )
+
+            inferred = [frame for index, frame in chunk if index % frame_skip == 0]
+            detections = iter(pose_estimator.detect_frames(inferred)) if inferred else iter(())
+
+            for index, frame in chunk:
+                timestamp = index / fps
+                infer = index % frame_skip == 0
+
+                encoded_frame = frame_buffer.push(timestamp, frame) if clips else None
+
+                people = pose_estimator.process_frame(
+                    frame,
+                    infer=infer,
+                    detections=next(detections) if infer else None
+                )
+                frames += 1
+
+                if recording:
+                    if encoded_frame is not None:
+                        clip_frames.append(encoded_frame)
+                    if timestamp - record_start_time >= clip_after_seconds:
+                        recording = False
+                        clip_writer.submit(clip_id, name, snapshot_frame, before_frames + clip_frames, fps,
+                                           snapshot_people, snapshot_statuses)
+                        clip_frames = []
+                        before_frames = []
+
+                results = fall_rule_batch(
+                    people.ids, people.kpts, people.boxes,
+                    fps=fps,
+                    fall_memory=fall_memory,
+                    camera_id=name,
+                    camera_name="file",
+                    now=timestamp
+                )
+                for (person_id, kpts, bbox), (status, alert_triggered) in zip(people, results):
+                    if not alert_triggered:
+                        continue
+
+                    alert_id = str(uuid.uuid4())
+                    event = {
+                        "alert_id": alert_id,
+                        "file": os.path.basename(path),
+                        "frame": index,
+                        "timestamp": round(timestamp, 3),
+                        "track_id": person_id,
+                        "status": status,
+                        "indicators": fall_memory.indicators_of(person_id),
+                        "bbox": [round(float(v), 1) for v in bbox]
+                    }
+
+                    if clips and not recording:
+                        clip_id = alert_id
+                        event["clip"] = os.path.join(clip_folder, f"{clip_id}.mp4")
+                        snapshot_frame = frame.copy()
+                        snapshot_people = people
+                        snapshot_statuses = [status for status, _ in results]
+                        before_frames = frame_buffer.frames()
+                        recording = True
+                        record_start_time = timestamp
+                        clip_frames = []
+
+                    events_file.write(json.dumps(event) + "\n")
+                    events += 1
+
+    if clip_writer is not None:
+        if recording:
+            clip_writer.submit(clip_id, name, snapshot_frame, before_frames + clip_frames, fps,
+                              snapshot_people, snapshot_statuses)
+        clip_writer.shutdown()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "file": os.path.basename(path),
+        "frames": frames,
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+        "video_seconds": round(frames / fps, 2) if fps else 0.0,
+        "seconds": round(elapsed, 2),
+        "events": events,
+        "events_path": events_path
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+", help="video files to process")
+    parser.add_argument("--out", default="fall_events", help="output folder for JSONL (and clips)")
+    parser.add_argument("--model", default=config["params"]["model_path"])
+    parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 1) // 2)),
+                        help="files processed in parallel")
+    parser.add_argument("--batch", type=int, default=batch_size, help="frames per inference batch")
+    parser.add_argument("--frame-skip", type=int, default=1, help="run the model on every k-th frame")
+    parser.add_argument("--clips", action="store_true", help="also write an mp4 clip per fall")
+    parser.add_argument("--verbose", action="store_true", help="log every fall with its rule trace")
+    # read by app_config.config_path() before anything else is imported
+    parser.add_argument("--config", help=f"config.json to use, default ${ENV_VAR} or main/config.json")
+    args = parser.parse_args()
+
+    setup_logging(camera="main")
+    os.makedirs(args.out, exist_ok=True)
+
+    workers = max(1, min(args.workers, len(args.files)))
+    # split the cores between the workers, each would start one thread per core
+    threads = max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None
+    jobs = [
+        (path, args.out, args.model, max(1, args.frame_skip), args.batch, args.clips, args.verbose, threads)
+        for path in args.files
+    ]
+
+    start = time.time()
+    if workers == 1:
+        results = map(process_file, jobs)
+    else:
+        # one model per worker process, loaded on its first file
+        logger.info("%d workers with %d inference threads each", workers, threads)
+        pool = mp.get_context(config["startup"]["start_method"]).Pool(workers)
+        results = pool.imap_unordered(process_file, jobs)
+
+    total_frames = 0
+    for result in results:
+        total_frames += result["frames"]
+        speed = result["video_seconds"] / result["seconds"] if result["seconds"] else 0.0
+        logger.info("%s: %d frames at %s fps (%.1fx realtime), %d fall events -> %s",
+                    result["file"], result["frames"], result["fps"], speed, result["events"],
+                    result["events_path"], extra={"rate_limit": False})
+
+    if workers > 1:
+        pool.close()
+        pool.join()
+
+    elapsed = time.time() - start
+    logger.info("%d files, %d frames in %.1fs (%.1f fps total)",
+                len(jobs), total_frames, elapsed, total_frames / max(elapsed, 1e-6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import cv2
+import json
+import numpy as np
+
+
+def parse_roi(value):
+    """
+    Read the Cameras.Roi JSON into a list of (x, y) points
+
+    Accepted forms (pixels, or 0..1 fractions of the frame size):
+        [[x, y], [x, y], ...]
+        [{"x": .., "y": ..}, ...]
+        {"points": [...]}
+        {"x": .., "y": .., "w": .., "h": ..}  /  {"x1": .., "y1": .., "x2": .., "y2": ..}
+
+    Returns None when no ROI is configured.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        value = value.strip()
+        if not value or value.upper() in ("NA", "NULL"):
+            return None
+        value = json.loads(value)
+
+    if isinstance(value, dict):
+        if "points" in value:
+            value = value["points"]
+        elif "w" in value:
+            x, y, w, h = value["x"], value["y"], value["w"], value["h"]
+            value = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+        elif "x1" in value:
+            x1, y1, x2, y2 = value["x1"], value["y1"], value["x2"], value["y2"]
+            value = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        else:
+            raise ValueError(f"Unsupported ROI format: {value}")
+
+    points = [(p["x"], p["y"]) if isinstance(p, dict) else (p[0], p[1]) for p in value]
+    if len(points) < 3:
+        raise ValueError(f"ROI needs at least 3 points, got {len(points)}")
+
+    return points
+
+
+class Roi:
+    """Crop frames to the bounding box of a ROI polygon and map results back"""
+
+    def __init__(self, points, mask_outside=True):
+        self.points = np.array(points, dtype=np.float64)
+        self.normalized = bool(np.all(self.points <= 1.0))
+        self.mask_outside = mask_outside
+
+        self.frame_shape = None
+        self.rect = None    # x1, y1, x2, y2 in pixels
+        self.mask = None    # polygon mask of the crop
+
+    def _prepare(self, frame_shape):
+        h, w = frame_shape[:2]
+        polygon = self.points * [w, h] if self.normalized else self.points
+        polygon = np.round(polygon).astype(np.int32)
+
+        x1, y1 = np.clip(polygon.min(axis=0), 0, [w - 1, h - 1])
+        x2, y2 = np.clip(polygon.max(axis=0) + 1, 1, [w, h])
+        self.rect = (int(x1), int(y1), int(x2), int(y2))
+
+        # full-rectangle polygons need no mask
+        area = cv2.contourArea(polygon.astype(np.float32))
+        if self.mask_outside and area < 0.99 * (x2 - x1) * (y2 - y1):
+            self.mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+            cv2.fillPoly(self.mask, [polygon - [x1, y1]], 255)
+        else:
+            self.mask = None
+
+        self.frame_shape = frame_shape[:2]
+
+    def crop(self, frame):
+        """Returns the cropped (and masked) region, the frame itself is not modified"""
+        if self.frame_shape != frame.shape[:2]:
+            self._prepare(frame.shape)
+
+        x1, y1, x2, y2 = self.rect
+        region = frame[y1:y2, x1:x2]
+
+        if self.mask is not None:
+            region = cv2.bitwise_and(region, region, mask=self.mask)
+
+        return region
+
+    def to_frame(self, detections):
+        """Shift (xyxy, scores, kpts, kpt_conf) from crop to full-frame coordinates"""
+        xyxy, scores, kpts_xy, kpts_conf = detections
+        x1, y1, _, _ = self.rect
+
+        return (xyxy + np.array([x1, y1, x1, y1], dtype=xyxy.dtype),
+                scores,
+                kpts_xy + np.array([x1, y1], dtype=kpts_xy.dtype),
+                kpts_conf)
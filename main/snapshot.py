@@ -0,0 +1,42 @@
+import cv2
+import base64
+
+
+def limit_size(img, max_side):
+    """Downscale so the longest side is at most max_side (0 keeps the original size)"""
+    h, w = img.shape[:2]
+    longest = max(h, w)
+
+    if not max_side or longest <= max_side:
+        return img
+
+    scale = max_side / longest
+    return cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def encode_jpeg(img, quality=85, max_side=0):
+    ok, buf = cv2.imencode(".jpg", limit_size(img, max_side), [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return buf.tobytes()
+
+
+def to_data_url(jpeg_bytes):
+    img_encoded = base64.b64encode(jpeg_bytes).decode("utf-8")
+    return f"data:image/jpeg;base64,{img_encoded}"
+
+
+def make_snapshot(img, quality=85, max_side=1280, thumb_side=320, thumb_quality=70):
+    """
+    Encode a BGR frame straight from OpenCV
+
+    Returns:
+        (data_url, thumbnail_jpeg_bytes)
+    """
+    snapshot = limit_size(img, max_side)
+    data_url = to_data_url(encode_jpeg(snapshot, quality))
+
+    # thumbnail from the already reduced image, cheaper than from full size
+    thumbnail = encode_jpeg(snapshot, thumb_quality, thumb_side)
+
+    return data_url, thumbnail
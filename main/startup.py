@@ -0,0 +1,35 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Measure and log the duration of each startup phase"""
+
+    def __init__(self, name, start=None):
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.phases = []
+
+    @contextmanager
+    def phase(self, label):
+        phase_start = time.time()
+        try:
+            yield
+        finally:
+            self.mark(label, time.time() - phase_start)
+
+    def mark(self, label, seconds):
+        self.phases.append((label, seconds))
+        logger.info("%s: %s %.0f ms", self.name, label, seconds * 1000, extra={"rate_limit": False})
+
+    def since_start(self, label):
+        """Record the time from self.start until now"""
+        self.mark(label, time.time() - self.start)
+
+    def report(self):
+        total = time.time() - self.start
+        parts = ", ".join(f"{label} {seconds:.2f}s" for label, seconds in self.phases)
+        logger.info("%s: total %.2fs (%s)", self.name, total, parts, extra={"rate_limit": False})
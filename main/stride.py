@@ -0,0 +1,55 @@
+class InferenceStride:
+    """
+    Decide on which frames the pose model runs
+
+    Runs the model every k-th frame. k starts at frame_skip, grows up to
+    max_frame_skip while inference cannot keep up with the frame budget and
+    drops back to 1 as soon as any person is not NORMAL.
+    """
+
+    def __init__(self, frame_skip, max_frame_skip, target_fps):
+        self.base = max(1, int(frame_skip))
+        self.max = max(self.base, int(max_frame_skip))
+        self.budget = 1.0 / target_fps
+
+        self.k = self.base
+        self.counter = 0
+        self.infer_time = None  # moving average of one inference (seconds)
+
+    def should_infer(self):
+        infer = self.counter % self.k == 0
+        self.counter += 1
+        return infer
+
+    def update(self, statuses, infer_time=None):
+        """
+        Args:
+            statuses: fall statuses of the people in the current frame
+            infer_time: duration of the inference if it ran on this frame
+        """
+        if infer_time is not None:
+            if self.infer_time is None:
+                self.infer_time = infer_time
+            else:
+                self.infer_time = 0.9 * self.infer_time + 0.1 * infer_time
+
+        # scene activity: full rate while anyone may be falling
+        if any(status != "NORMAL" for status in statuses):
+            self.set_stride(1)
+            return
+
+        k = max(self.k, self.base)
+
+        # load: spread inference over more frames when it does not fit the budget
+        if self.infer_time is not None:
+            if self.infer_time / k > self.budget and k < self.max:
+                k += 1
+            elif k > self.base and self.infer_time / (k - 1) < 0.5 * self.budget:
+                k -= 1
+
+        self.set_stride(k)
+
+    def set_stride(self, k):
+        if k != self.k:
+            self.k = k
+            self.counter = 0
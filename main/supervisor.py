@@ -0,0 +1,131 @@
+import cv2
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Backoff:
+    """Exponential backoff delay: initial, initial*factor, ... capped at maximum"""
+
+    def __init__(self, initial=1.0, maximum=30.0, factor=2.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.delay = initial
+
+    def next(self):
+        delay = self.delay
+        self.delay = min(self.delay * self.factor, self.maximum)
+        return delay
+
+    def reset(self):
+        self.delay = self.initial
+
+
+def open_stream(source, timeout_ms):
+    """Open a capture with FFmpeg open/read timeouts so a dead camera cannot block forever"""
+    cap = cv2.VideoCapture(
+        source,
+        cv2.CAP_FFMPEG,
+        [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(timeout_ms),
+         cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(timeout_ms)]
+    )
+    if not cap.isOpened():
+        cap.release()
+        return None
+    return cap
+
+
+class CameraSupervisor:
+    """
+    Keep one worker process per camera alive
+
+    A worker that crashes (non-zero exit code) is started again after an
+    exponential backoff; a clean exit (stream ended, ESC) is left alone.
+    """
+
+    def __init__(self, start_worker, backoff_initial=1.0, backoff_max=60.0, on_crash=None):
+        # start_worker(cam) -> started mp.Process
+        self.start_worker = start_worker
+        # on_crash(cam) releases what a crashed worker held, before its restart
+        self.on_crash = on_crash
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.workers = {}
+
+    def add(self, cam):
+        self.workers[cam["CameraId"]] = {
+            "cam": cam,
+            "process": self.start_worker(cam),
+            "started": time.time(),
+            "restarts": 0,
+            "backoff": Backoff(self.backoff_initial, self.backoff_max),
+            "restart_at": None
+        }
+
+    def poll(self):
+        """Restart crashed workers whose backoff expired, returns False once all are done"""
+        now = time.time()
+        alive = False
+
+        for camera_id, w in self.workers.items():
+            p = w["process"]
+
+            if p.is_alive():
+                alive = True
+                # stable for a while -> forget earlier crashes
+                if now - w["started"] > self.backoff_max:
+                    w["backoff"].reset()
+                continue
+
+            if p.exitcode == 0 and w["restart_at"] is None:
+                continue
+
+            alive = True
+            if w["restart_at"] is None:
+                if self.on_crash is not None:
+                    self.on_crash(w["cam"])
+                delay = w["backoff"].next()
+                w["restart_at"] = now + delay
+                logger.warning("Camera exited with %s, restarting in %.0fs", p.exitcode, delay,
+                               extra={"camera": camera_id})
+
+            elif now >= w["restart_at"]:
+                w["process"] = self.start_worker(w["cam"])
+                w["started"] = now
+                w["restarts"] += 1
+                w["restart_at"] = None
+
+        return alive
+
+    def report(self):
+        now = time.time()
+        for camera_id, w in self.workers.items():
+            state = "running" if w["process"].is_alive() else "stopped"
+            uptime = now - w["started"] if state == "running" else 0
+            logger.info("%s uptime %.0fs restarts %d", state, uptime, w["restarts"],
+                        extra={"camera": camera_id, "rate_limit": False})
+
+    def stop(self, stop_event, timeout):
+        """
+        Ask every worker to finish via stop_event and wait up to timeout
+        seconds in total, so queued clips and alerts are written. Workers
+        still running after that are terminated, then killed.
+        """
+        stop_event.set()
+        deadline = time.time() + timeout
+        for w in self.workers.values():
+            w["process"].join(max(0.0, deadline - time.time()))
+
+        for camera_id, w in self.workers.items():
+            p = w["process"]
+            if not p.is_alive():
+                continue
+            logger.warning("Camera did not stop within %.0fs, terminating", timeout,
+                           extra={"camera": camera_id})
+            p.terminate()
+            p.join(5)
+            if p.is_alive():
+                p.kill()
+                p.join(1)
@@ -0,0 +1,62 @@
+class TrackRegistry:
+    """
+    Lifecycle of ByteTrack ids: birth, loss and removal
+
+    Every per-track store (Kalman state, box state, fall_memory) registers
+    a cleanup callback with on_evict(). A track that has not been seen for
+    ttl tracker frames is evicted from all of them, matching the
+    track_buffer after which ByteTrack itself drops a lost track, so memory
+    stays flat on long runs. ByteTrack never reuses ids.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.frame = 0
+        self.last_seen = {}     # track id -> tracker frame
+        self.lost = set()
+        self.callbacks = []
+
+        # counters
+        self.born = 0
+        self.evicted = 0
+
+    def on_evict(self, callback):
+        """callback(track_id) is called once for every evicted track"""
+        self.callbacks.append(callback)
+
+    def update(self, track_ids):
+        """Record the ids seen on a tracker frame, returns the ids evicted on it"""
+        self.frame += 1
+
+        for track_id in track_ids:
+            if track_id not in self.last_seen:
+                self.born += 1
+            self.last_seen[track_id] = self.frame
+            self.lost.discard(track_id)
+
+        expired = []
+        for track_id, seen in self.last_seen.items():
+            if seen == self.frame:
+                continue
+            self.lost.add(track_id)
+            if self.frame - seen > self.ttl:
+                expired.append(track_id)
+
+        for track_id in expired:
+            self.evict(track_id)
+        return expired
+
+    def evict(self, track_id):
+        self.last_seen.pop(track_id, None)
+        self.lost.discard(track_id)
+        self.evicted += 1
+        for callback in self.callbacks:
+            callback(track_id)
+
+    def stats(self):
+        return {
+            "live": len(self.last_seen) - len(self.lost),
+            "lost": len(self.lost),
+            "born": self.born,
+            "evicted": self.evicted
+        }